@@ -0,0 +1,523 @@
+import argparse, asyncio, html, io, json, os, random, requests, subprocess, tempfile, threading, time
+from contextlib import redirect_stdout
+from datetime import datetime
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import job_scraper
+
+
+# Recorded job board responses, laid out by the path the fixture server serves them on
+BENCHMARK_FIXTURES_DIRECTORY = "benchmark_fixtures"
+# Every benchmark run along with the version of the code it was run on, so runs can be compared between versions
+BENCHMARK_RESULTS_FILE = "benchmark_results.json"
+
+BENCHMARK_SCALES = [1000, 10000, 100000]
+BENCHMARK_REPEATS = 3
+# Synthetic positions are spread over this many job boards for each ATS
+BOARDS_PER_ATS = 10
+WORKDAY_PAGE_SIZE = job_scraper.WORKDAY_PAGE_SIZE
+# Larger DOM snapshots spend nearly all of their time in WebDriver round trips, so Selenium is only benchmarked at this scale
+SELENIUM_SCALE = 1000
+# A benchmark counts as a regression once it is this much slower than in the previous run, and by more than the noise floor
+REGRESSION_THRESHOLD = 0.1
+REGRESSION_NOISE_FLOOR = 0.01
+
+CONTENT_TYPES = {".html": "text/html; charset=utf-8", ".json": "application/json"}
+
+TITLE_LEVELS = ["", "Junior ", "Senior ", "Staff ", "Principal ", "Lead ", "Associate "]
+TITLE_ROLES = ["Software Engineer", "Frontend Engineer", "Backend Engineer", "Data Scientist", "Product Manager", "Designer",
+               "Engineering Manager", "Site Reliability Engineer", "Recruiter", "Account Executive", "Software Engineering Intern"]
+TITLE_TEAMS = ["", ", Payments", ", Growth", ", Infrastructure", ", Mobile", ", Machine Learning", ", Security", " - New Grad"]
+
+
+# Serves fixture pages from memory on a local port in place of the live job boards
+class FixtureServer:
+    def __init__(self):
+        self.pages = {}
+        pages = self.pages
+
+        class FixtureHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                page = pages.get(urlparse(self.path).path)
+                if page is None:
+                    self.send_error(404)
+                    return
+
+                content_type, body = page
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+        self.server.daemon_threads = True
+        self.root_link = "http://127.0.0.1:{}".format(self.server.server_address[1])
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def add(self, path, text, content_type):
+        self.pages[path] = (content_type, text.encode("utf-8"))
+
+    # Serves every recorded fixture file on the path it was recorded for
+    def add_fixtures(self, directory):
+        for root, _, files in os.walk(directory):
+            for file_name in files:
+                path, extension = os.path.splitext(os.path.relpath(os.path.join(root, file_name), directory))
+                if extension in CONTENT_TYPES:
+                    with open(os.path.join(root, file_name), encoding="utf-8") as f:
+                        self.add("/" + path.replace(os.sep, "/"), f.read(), CONTENT_TYPES[extension])
+
+
+# Points the Greenhouse and Lever scrapers at the fixture server, Workday and Selenium job boards carry their own links
+def point_scrapers_at(root_link):
+    job_scraper.GREENHOUSE_ROOT_LINK = root_link + "/greenhouse/"
+    job_scraper.GREENHOUSE_API_ROOT_LINK = root_link + "/greenhouse-api/"
+    job_scraper.LEVER_ROOT_LINK = root_link + "/lever/"
+    job_scraper.LEVER_API_ROOT_LINK = root_link + "/lever-api/"
+
+
+def read_rule_file(file_name):
+    with open(file_name) as f:
+        return [line.rstrip('\n') for line in f if line.strip() != ""]
+
+
+def make_word(rng):
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(5, 9)))
+
+
+# Builds rule lists the size of blacklisted_locations.txt, using the repo's real location lists
+def make_rules(rng, link_count):
+    blacklisted_locations = read_rule_file("blacklisted_locations.txt")
+    whitelisted_locations = read_rule_file("whitelisted_locations.txt")
+    rule_count = len(blacklisted_locations)
+
+    return {
+        "blacklisted_position_titles": ["Recruiter", "Account Executive"] + [make_word(rng).title() for _ in range(rule_count - 2)],
+        "required_keywords": ["engineer", "intern"] + [make_word(rng) for _ in range(rule_count - 2)],
+        "blacklisted_keywords": ["manager", "staff", "principal"] + [make_word(rng) for _ in range(rule_count - 3)],
+        "whitelisted_locations": whitelisted_locations,
+        "blacklisted_locations": blacklisted_locations,
+        "already_seen_links": [make_link(rng.randrange(link_count)) for _ in range(rule_count)]
+    }
+
+
+def make_link(index):
+    return "https://jobs.example.com/positions/{}".format(index)
+
+
+# Makes positions with a realistic mix of titles and of whitelisted, blacklisted and unknown locations
+def make_positions(rng, count, rules):
+    known_locations = rules["whitelisted_locations"] + rules["blacklisted_locations"]
+    unknown_locations = ["{} City, {}".format(make_word(rng).title(), make_word(rng).upper()[:2]) for _ in range(len(known_locations) // 4)]
+
+    return [job_scraper.Position(
+        company="Company {}".format(index % 500),
+        title=rng.choice(TITLE_LEVELS) + rng.choice(TITLE_ROLES) + rng.choice(TITLE_TEAMS),
+        link=make_link(index),
+        location=rng.choice(known_locations) if rng.random() < 0.9 else rng.choice(unknown_locations)
+    ) for index in range(count)]
+
+
+def split_into_boards(positions, board_count=BOARDS_PER_ATS):
+    return [positions[board::board_count] for board in range(board_count)]
+
+
+def render_greenhouse_html(positions):
+    return '<html><body><section class="level-0"><h3>Engineering</h3>' + "".join(
+        '<div class="opening"><a href="{}">{}</a><span class="location">{}</span></div>'.format(
+            html.escape(position["Link"]), html.escape(position["Title"]), html.escape(position["Location"]))
+        for position in positions) + '</section></body></html>'
+
+
+def render_greenhouse_json(positions):
+    return json.dumps({"jobs": [{"title": position["Title"], "absolute_url": position["Link"], "location": {"name": position["Location"]}}
+                                for position in positions]})
+
+
+def render_lever_html(positions):
+    return '<html><body>' + "".join(
+        '<div class="posting"><a class="posting-title" href="{}"><h5>{}</h5><span class="sort-by-location">{}</span>'
+        '<span class="sort-by-commitment">Full-time</span></a></div>'.format(
+            html.escape(position["Link"]), html.escape(position["Title"]), html.escape(position["Location"]))
+        for position in positions) + '</body></html>'
+
+
+def render_lever_json(positions):
+    return json.dumps([{"text": position["Title"], "hostedUrl": position["Link"], "categories": {"location": position["Location"], "commitment": "Full-time"}}
+                       for position in positions])
+
+
+# Boards without a total are paged through until a page comes back short, the same as Workday boards that leave it out
+def render_workday_page(positions, pagination_uri, total=None):
+    page = {
+        "endPoints": [{"type": "Pagination", "uri": pagination_uri}],
+        "listItems": [{
+            "title": {"instances": [{"text": position["Title"]}], "commandLink": urlparse(position["Link"]).path},
+            "subtitles": [{"instances": [{"text": position["Location"]}]}]
+        } for position in positions]
+    }
+    if total is not None:
+        page["total"] = total
+    return json.dumps({"body": {"children": [page]}})
+
+
+def render_selenium_board(positions):
+    return '<html><body><div id="jobs">' + "".join(
+        '<div class="job"><a class="job-title" href="{}">{}</a><span class="job-location">{}</span></div>'.format(
+            html.escape(position["Link"]), html.escape(position["Title"]), html.escape(position["Location"]))
+        for position in positions) + '</div></body></html>'
+
+
+# Serves the positions as Greenhouse, Lever, Workday and custom job boards and returns the job board lists that scrape them
+def add_synthetic_boards(server, positions, selenium_positions):
+    all_companies = {"greenhouse": [], "lever": [], "workday": [], "selenium": []}
+
+    for board, board_positions in enumerate(split_into_boards(positions)):
+        path = "board{}".format(board)
+        company = "Benchmark Board {}".format(board)
+
+        all_companies["greenhouse"].append({"Company": company, "Link": path})
+        server.add("/greenhouse/" + path, render_greenhouse_html(board_positions), CONTENT_TYPES[".html"])
+        server.add("/greenhouse-api/" + path + "/jobs", render_greenhouse_json(board_positions), CONTENT_TYPES[".json"])
+
+        all_companies["lever"].append({"Company": company, "Link": path})
+        server.add("/lever/" + path, render_lever_html(board_positions), CONTENT_TYPES[".html"])
+        server.add("/lever-api/" + path, render_lever_json(board_positions), CONTENT_TYPES[".json"])
+
+        all_companies["workday"].append({"Company": company, "Link": server.root_link + "/workday/" + path})
+        # Every other board leaves out the total, and like Workday serves an empty page past its last posting
+        pagination_uri = "/workday/" + path + "/page"
+        total = len(board_positions) if board % 2 == 0 else None
+        for offset in range(0, len(board_positions) + 1, WORKDAY_PAGE_SIZE):
+            server.add("/workday/" + path if offset == 0 else pagination_uri + "/" + str(offset),
+                       render_workday_page(board_positions[offset:offset + WORKDAY_PAGE_SIZE], pagination_uri, total), CONTENT_TYPES[".json"])
+
+    if len(selenium_positions) > 0:
+        server.add("/selenium/board", render_selenium_board(selenium_positions), CONTENT_TYPES[".html"])
+        all_companies["selenium"].append({
+            "Company Name": "Benchmark Board",
+            "Careers Website": server.root_link + "/selenium/board",
+            "Job Item": ".job",
+            "Job Item Title": ".job-title",
+            "Job Item Link": ".job-title",
+            "Job Item Location": ".job-location"
+        })
+
+    return all_companies
+
+
+# Loads the job boards that were recorded into the fixtures directory, pointing their links at the fixture server
+def load_recorded_boards(server, directory=BENCHMARK_FIXTURES_DIRECTORY):
+    try:
+        with open(os.path.join(directory, "boards.json")) as f:
+            all_companies = json.load(f)
+    except FileNotFoundError:
+        return None
+
+    server.add_fixtures(directory)
+    for job_board in all_companies["workday"]:
+        job_board["Link"] = server.root_link + job_board["Link"]
+    for job_board in all_companies["selenium"]:
+        job_board["Careers Website"] = server.root_link + job_board["Careers Website"]
+
+    return all_companies
+
+
+# Runs one of the get_positions_on_* ATS scrapers on a fresh fetch engine without a response cache
+# The stand-in serves every job board from one host, so the per-host request rate isn't limited
+def run_ats_scraper(scraper, job_boards, *args):
+    async def run():
+        engine = job_scraper.FetchEngine(host_request_rate=None)
+        try:
+            return await scraper(engine, job_boards, *args)
+        finally:
+            engine.close()
+
+    return asyncio.run(run())
+
+
+def run_selenium_scraper(job_boards):
+    with job_scraper.BrowserPool(1) as pool:
+        return job_scraper.get_positions_using_selenium(pool, [
+            (job_scraper.get_positions_on_selenium_board, job_board, job_scraper.get_browser_profile(job_board)) for job_board in job_boards])
+
+
+def is_chromedriver_available():
+    return os.path.exists("./chromedriver")
+
+
+# Lists every scraper benchmark for the job boards as (name, function)
+def get_scraper_benchmarks(all_companies, label):
+    benchmarks = []
+
+    if len(all_companies["greenhouse"]) > 0:
+        benchmarks += [
+            ("get_positions_on_greenhouse (api" + label + ")", lambda: run_ats_scraper(job_scraper.get_positions_on_greenhouse, all_companies["greenhouse"], True)),
+            ("get_positions_on_greenhouse (html" + label + ")", lambda: run_ats_scraper(job_scraper.get_positions_on_greenhouse, all_companies["greenhouse"], False))
+        ]
+    if len(all_companies["lever"]) > 0:
+        benchmarks += [
+            ("get_positions_on_lever (api" + label + ")", lambda: run_ats_scraper(job_scraper.get_positions_on_lever, all_companies["lever"], True)),
+            ("get_positions_on_lever (html" + label + ")", lambda: run_ats_scraper(job_scraper.get_positions_on_lever, all_companies["lever"], False))
+        ]
+    if len(all_companies["workday"]) > 0:
+        benchmarks.append(("get_positions_on_workday (json" + label + ")", lambda: run_ats_scraper(job_scraper.get_positions_on_workday, all_companies["workday"])))
+    if len(all_companies["selenium"]) > 0 and is_chromedriver_available():
+        benchmarks.append(("get_positions_on_selenium_board (dom snapshot" + label + ")", lambda: run_selenium_scraper(all_companies["selenium"])))
+
+    return benchmarks
+
+
+# Lists every filter benchmark and the CSV export as (name, function)
+def get_filter_benchmarks(positions, rules, export_file):
+    return [
+        ("filter_by_position_title", lambda: job_scraper.filter_by_position_title(positions, rules["blacklisted_position_titles"])),
+        ("filter_by_position_title_keywords (required)", lambda: job_scraper.filter_by_position_title_keywords(positions, rules["required_keywords"], [])),
+        ("filter_by_position_title_keywords (blacklisted)", lambda: job_scraper.filter_by_position_title_keywords(positions, [], rules["blacklisted_keywords"])),
+        ("filter_by_location", lambda: job_scraper.filter_by_location(positions, rules["whitelisted_locations"], rules["blacklisted_locations"])),
+        ("filter_by_already_seen", lambda: job_scraper.filter_by_already_seen(positions, rules["already_seen_links"])),
+        ("PositionFilter.filter", lambda: job_scraper.PositionFilter(
+            rules["blacklisted_position_titles"], [], rules["blacklisted_keywords"], rules["whitelisted_locations"],
+            rules["blacklisted_locations"], rules["already_seen_links"]).filter(positions)),
+        ("export_to_csv", lambda: job_scraper.export_to_csv(positions, export_file) or positions)
+    ] + [
+        ("PositionExport ({})".format(export_format), partial(export_positions, positions, export_format, os.path.dirname(export_file)))
+        for export_format, (_, _, module) in job_scraper.EXPORT_FORMATS.items() if module is None or job_scraper.EXPORT_MODULES[module] is not None
+    ]
+
+
+def export_positions(positions, export_format, directory):
+    export = job_scraper.PositionExport(export_format, "benchmark", directory=directory)
+    for position in positions:
+        export.write(position)
+    export.close()
+    return positions
+
+
+# Runs a benchmark a number of times with its console output hidden and keeps the fastest time
+def time_benchmark(function, repeats):
+    best = None
+
+    for _ in range(repeats):
+        job_scraper.run_metrics.reset()
+        with redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = function()
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return {"Seconds": best, "Positions": len(result)}
+
+
+def run_benchmarks(benchmarks, suffix, repeats, results):
+    for name, function in benchmarks:
+        name += suffix
+        results[name] = time_benchmark(function, repeats)
+        print("\t{}: {:.3f}s, {} positions".format(name, results[name]["Seconds"], results[name]["Positions"]))
+
+
+# Benchmarks every scraper, filter and the CSV export at each scale, then against the recorded job boards if there are any
+def benchmark(scales=BENCHMARK_SCALES, repeats=BENCHMARK_REPEATS, fixtures_directory=BENCHMARK_FIXTURES_DIRECTORY):
+    results = {}
+
+    if not is_chromedriver_available():
+        print("Skipping Selenium benchmarks, chromedriver was not found")
+
+    with tempfile.TemporaryDirectory() as export_directory:
+        for scale in scales:
+            print("Benchmarking {} positions".format(scale))
+            rng = random.Random(scale)
+            rules = make_rules(rng, scale)
+            positions = make_positions(rng, scale, rules)
+
+            with FixtureServer() as server:
+                point_scrapers_at(server.root_link)
+                all_companies = add_synthetic_boards(server, positions, positions[:SELENIUM_SCALE] if scale == min(scales) else [])
+                run_benchmarks(get_scraper_benchmarks(all_companies, ""), " @ {}".format(scale), repeats, results)
+
+            run_benchmarks(get_filter_benchmarks(positions, rules, os.path.join(export_directory, "scraped_positions.csv")), " @ {}".format(scale), repeats, results)
+
+    with FixtureServer() as server:
+        point_scrapers_at(server.root_link)
+        all_companies = load_recorded_boards(server, fixtures_directory)
+        if all_companies is not None:
+            print("Benchmarking recorded job boards")
+            run_benchmarks(get_scraper_benchmarks(all_companies, ", recorded"), "", repeats, results)
+
+    return results
+
+
+def get_version():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        changes = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+    return commit + ("-dirty" if changes != "" else "")
+
+
+def load_results(file_name=BENCHMARK_RESULTS_FILE):
+    try:
+        with open(file_name) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+# Prints how each benchmark changed since the previous run and returns the names of the ones that got slower
+def compare_results(previous_run, results):
+    regressions = []
+
+    print("Compared to {} ({}):".format(previous_run["Version"], previous_run["Date"]))
+    for name, result in results.items():
+        previous = previous_run["Results"].get(name)
+        if previous is None:
+            continue
+
+        change = (result["Seconds"] - previous["Seconds"]) / previous["Seconds"] if previous["Seconds"] > 0 else 0
+        is_regression = change > REGRESSION_THRESHOLD and result["Seconds"] - previous["Seconds"] > REGRESSION_NOISE_FLOOR
+        if is_regression:
+            regressions.append(name)
+        print("\t{}{}: {:.3f}s -> {:.3f}s ({:+.0%})".format("REGRESSION " if is_regression else "", name, previous["Seconds"], result["Seconds"], change))
+
+    return regressions
+
+
+# Saves a live copy of every job board's pages into the fixtures directory, with links rewritten to the paths they are served on
+def record_fixtures(all_companies, directory=BENCHMARK_FIXTURES_DIRECTORY):
+    recorded = {"greenhouse": [], "lever": [], "workday": [], "selenium": []}
+
+    def save(path, text):
+        file_name = os.path.join(directory, *path.strip("/").split("/"))
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+        with open(file_name, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def fetch(link, headers=None):
+        page = requests.get(link, headers=headers, timeout=job_scraper.REQUEST_TIMEOUT)
+        page.raise_for_status()
+        return page.text
+
+    for ats, api_root_link, api_path, root_link in [
+        ("greenhouse", job_scraper.GREENHOUSE_API_ROOT_LINK, "{}/jobs", job_scraper.GREENHOUSE_ROOT_LINK),
+        ("lever", job_scraper.LEVER_API_ROOT_LINK, "{}", job_scraper.LEVER_ROOT_LINK)
+    ]:
+        for job_board in all_companies[ats]:
+            board_path = job_scraper.get_board_path(job_board)
+            token = job_scraper.get_greenhouse_board_token(job_board) if ats == "greenhouse" else board_path
+            if "?" in board_path:
+                print("\tSkipping " + job_board["Company"] + ", its link has a query string")
+                continue
+            try:
+                save("/" + ats + "-api/" + api_path.format(token) + ".json",
+                     fetch(api_root_link + api_path.format(token) + ("?mode=json" if ats == "lever" else ""), {"Accept": "application/json"}))
+                save("/" + ats + "/" + board_path + ".html", fetch(root_link + board_path))
+            except requests.exceptions.RequestException as error:
+                print("\tERROR:", job_board["Company"], "could not be recorded:", error)
+                continue
+            recorded[ats].append(job_board)
+            print("\tRecording " + job_board["Company"] + "... Done")
+
+    for job_board in all_companies["workday"]:
+        path = "/workday/" + urlparse(job_board["Link"]).path.rstrip("/").split("/")[-1].lower()
+        headers = {"Accept": "application/json,application/xml"}
+        base_url = "{0.scheme}://{0.netloc}".format(urlparse(job_board["Link"]))
+        try:
+            page_text = fetch(job_board["Link"], headers)
+            page = job_scraper.parse_workday_page(page_text, job_board["Company"], base_url)
+            end_point = page["Pagination End Point"]
+            local_end_point = path + "/page"
+            pages = [(path, page_text)]
+            offset = len(page["Positions"] or [])
+            while end_point is not None and page["Positions"] and (page["Total"] is None or offset < page["Total"]):
+                page_text = fetch(end_point + str(offset), headers)
+                page = job_scraper.parse_workday_page(page_text, job_board["Company"], base_url)
+                pages.append((local_end_point + "/" + str(offset), page_text))
+                offset += len(page["Positions"] or [])
+        except (requests.exceptions.RequestException, ValueError, KeyError, TypeError) as error:
+            print("\tERROR:", job_board["Company"], "could not be recorded:", error)
+            continue
+        for page_path, page_text in pages:
+            if end_point is not None:
+                page_text = page_text.replace('"' + end_point[len(base_url):-1] + '"', '"' + local_end_point + '"')
+            save(page_path + ".json", page_text)
+        recorded["workday"].append({"Company": job_board["Company"], "Link": path})
+        print("\tRecording " + job_board["Company"] + "... Done")
+
+    if is_chromedriver_available():
+        with job_scraper.BrowserPool(1) as pool, pool.browser(job_scraper.DEFAULT_BROWSER_PROFILE) as browser:
+            for index, job_board in enumerate(all_companies["selenium"]):
+                path = "/selenium/{}-{}".format(job_board["Company Name"].replace(" ", "").lower(), index)
+                try:
+                    browser.get(job_board["Careers Website"])
+                    job_scraper.WebDriverWait(browser, 20).until(job_scraper.EC.visibility_of_element_located((job_scraper.By.CSS_SELECTOR, job_board["Job Item"])))
+                    save(path + ".html", browser.page_source)
+                except (job_scraper.TimeoutException, job_scraper.WebDriverException):
+                    print("\tERROR:", job_board["Company Name"], "could not be recorded!")
+                    continue
+                recorded["selenium"].append(dict(job_board, **{"Careers Website": path}))
+                print("\tRecording " + job_board["Company Name"] + "... Done")
+    else:
+        print("Skipping DOM snapshots, chromedriver was not found")
+
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "boards.json"), "w") as f:
+        json.dump(recorded, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the job scrapers, filters and CSV export offline against a local stand-in for the job boards")
+    parser.add_argument("--scales", type=int, nargs="+", default=BENCHMARK_SCALES,
+                        help="numbers of synthetic positions to benchmark with (default: %(default)s)")
+    parser.add_argument("--repeats", type=int, default=BENCHMARK_REPEATS,
+                        help="number of times to run each benchmark, the fastest time is kept (default: %(default)s)")
+    parser.add_argument("--fixtures", default=BENCHMARK_FIXTURES_DIRECTORY,
+                        help="directory of recorded job board pages (default: %(default)s)")
+    parser.add_argument("--results", default=BENCHMARK_RESULTS_FILE,
+                        help="JSON file every benchmark run is added to (default: %(default)s)")
+    parser.add_argument("--record", action="store_true",
+                        help="record the live job boards into the fixtures directory instead of benchmarking")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="exit with an error if any benchmark got slower than in the previous run")
+    args = parser.parse_args()
+
+    if args.record:
+        print("Recording job boards into " + args.fixtures)
+        record_fixtures({
+            "greenhouse": json.load(open('greenhouse_companies.json')),
+            "lever": json.load(open('lever_companies.json')),
+            "selenium": json.load(open('selenium_companies.json')),
+            "workday": json.load(open('workday_companies.json'))
+        }, args.fixtures)
+        return
+
+    results = benchmark(args.scales, args.repeats, args.fixtures)
+
+    all_runs = load_results(args.results)
+    regressions = compare_results(all_runs[-1], results) if len(all_runs) > 0 else []
+
+    all_runs.append({"Version": get_version(), "Date": datetime.now().isoformat(), "Results": results})
+    with open(args.results, "w") as f:
+        json.dump(all_runs, f, indent=2)
+
+    if args.fail_on_regression and len(regressions) > 0:
+        raise SystemExit("{} benchmarks regressed".format(len(regressions)))
+
+
+if __name__ == '__main__':
+    main()
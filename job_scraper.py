@@ -1,80 +1,899 @@
-import csv, json, requests, string
+import argparse, asyncio, contextvars, csv, gzip, hashlib, heapq, json, os, queue, random, re, requests, shutil, socket, sqlite3, string, sys, tempfile
 from bs4 import BeautifulSoup
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from functools import partial
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
-import time
-from urllib.request import Request, urlopen
+from selenium.common.exceptions import TimeoutException, WebDriverException
+import multiprocessing, threading, time
+from urllib.parse import parse_qs, quote, urlparse
+
+# lxml parses job board HTML several times faster than BeautifulSoup, but isn't required
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:
+    lxml_html = None
+
+# pyarrow writes Parquet exports and zstandard compresses NDJSON exports, they're only needed if those exports are asked for
+try:
+    import pyarrow, pyarrow.parquet
+except ImportError:
+    pyarrow = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+GREENHOUSE_ROOT_LINK = "https://boards.greenhouse.io/"
+GREENHOUSE_API_ROOT_LINK = "https://boards-api.greenhouse.io/v1/boards/"
+LEVER_ROOT_LINK = "https://jobs.lever.co/"
+LEVER_API_ROOT_LINK = "https://api.lever.co/v0/postings/"
+
+# Default limits for the fetch engine, can be overridden from the command line
+MAX_CONCURRENT_REQUESTS = 32
+MAX_REQUESTS_PER_HOST = 4
+REQUEST_TIMEOUT = 30
+# Each host starts out allowed this many requests per second, with bursts of up to HOST_REQUEST_BURST
+# The rate is halved whenever the host throttles us with a 429 or 503 and slowly creeps back up while requests succeed
+HOST_REQUEST_RATE = 20
+HOST_REQUEST_BURST = 10
+MIN_HOST_REQUEST_RATE = 0.5
+HOST_REQUEST_RATE_INCREASE = 0.5
+# Requests that time out, can't connect or get one of these statuses are retried with jittered exponential backoff
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+THROTTLE_STATUS_CODES = [429, 503]
+MAX_RETRIES = 3
+RETRY_BACKOFF = 1
+MAX_RETRY_BACKOFF = 30
+# Waiting any longer than this for a Retry-After would hold up the whole run, so the request is given up on instead
+MAX_RETRY_AFTER = 120
+# After this many failed requests in a row from a job board to a host, its requests to the host fail straight away until the circuit has been open for a while
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_OPEN_TIME = 60
+# Number of processes Greenhouse and Lever HTML is parsed in, parsing is done on the event loop's thread if this is 1 or less
+PARSE_PROCESSES = os.cpu_count() or 1
+
+# Stores the ETag, Last-Modified, content hash and parsed result of every fetched page between runs
+RESPONSE_CACHE_FILE = "response_cache.json"
+
+# Stores the data endpoint of every custom job board that can be scraped without a browser, found while scraping it in a browser
+DATA_SOURCES_FILE = "data_sources.json"
+# Script tags that pages embed their data in, checked along with the data requests a page made
+EMBEDDED_DATA_SELECTORS = ["script#__NEXT_DATA__", "script[type='application/ld+json']"]
+# Most data requests checked per job board, and how long to wait before looking again on a board without a data source
+MAX_DATA_REQUESTS = 20
+DATA_SOURCE_RECHECK_TIME = 7 * 24 * 60 * 60
+
+# Machine readable report of the time, requests, bytes and positions of every scraper and filter in the last run
+RUN_REPORT_FILE = "run_report.json"
+
+# Maps abbreviations and alternative spellings of location names onto one canonical name, like "wa" onto "washington"
+LOCATION_ALIASES_FILE = "location_aliases.json"
+
+SCRAPED_POSITIONS_FILE = "scraped_positions.csv"
+CSV_FIELDS = ["Company", "Title", "Link", "Location"]
+
+# SQLite database holding every scraped position, when it was first and last scraped and whether it has been seen
+POSITIONS_DATABASE_FILE = "positions.db"
+# SQLite file of the job boards and pages scraped so far in a run, so a run that dies can be resumed, and how old a checkpoint can be to be resumed
+CHECKPOINT_FILE = "checkpoint.db"
+CHECKPOINT_MAX_AGE = 24 * 60 * 60
+# Number of streamed positions saved into the position store at a time
+STORE_BATCH_SIZE = 500
+# With --diff, the positions that were added, removed or changed since the previous run are exported into these files
+ADDED_POSITIONS_FILE = "added_positions.csv"
+REMOVED_POSITIONS_FILE = "removed_positions.csv"
+CHANGED_POSITIONS_FILE = "changed_positions.csv"
+CHANGED_CSV_FIELDS = CSV_FIELDS + ["Previous Title", "Previous Location"]
+# With --export, the exported positions are also written into a dataset directory per format in here, e.g. exports/scraped_positions.parquet
+# Each position is exported with the timestamp of the run that scraped it
+EXPORTS_DIRECTORY = "exports"
+EXPORT_FIELDS = CSV_FIELDS + ["Scraped"]
+# Number of positions written to an export file at a time, each batch is one Parquet row group
+EXPORT_BATCH_SIZE = 1000
+# Most export files a partitioned export keeps open at a time, a partition whose file was closed carries on in a new file
+MAX_OPEN_EXPORT_FILES = 64
+
+# SQLite database of job board scraping tasks shared between the coordinator and its workers
+WORK_QUEUE_FILE = "work_queue.db"
+# Greenhouse, Lever and Workday tasks only need HTTP, custom job board tasks need a browser
+HTTP_TASK = "http"
+BROWSER_TASK = "browser"
+# Number of HTTP tasks a worker scrapes at the same time
+HTTP_WORKER_TASKS = 16
+# How long workers and the coordinator wait between checks of the work queue
+WORKER_POLL_INTERVAL = 1
+# A task that has been running longer than this is assumed lost with its worker and is handed out again
+TASK_TIMEOUT = 900
+MAX_TASK_ATTEMPTS = 3
+
+# With --schedule, SQLite database of every job board's refresh interval and history of how often its positions change
+SCHEDULE_FILE = "schedule.db"
+# Refresh interval a job board starts with, and the shortest and longest it can adapt to
+INITIAL_REFRESH_INTERVAL = 6 * 60 * 60
+MIN_REFRESH_INTERVAL = 60 * 60
+MAX_REFRESH_INTERVAL = 7 * 24 * 60 * 60
+# A job board's refresh interval is divided by this when its positions changed since it was last scraped, and multiplied by the growth when they didn't
+REFRESH_INTERVAL_SHRINK = 2
+REFRESH_INTERVAL_GROWTH = 1.5
+# A job board that fails to scrape is tried again after at most this long, without changing its refresh interval
+FAILED_BOARD_RETRY_INTERVAL = 30 * 60
+# Most Greenhouse, Lever and Workday job boards, and custom job boards, that one round of the scheduler scrapes
+SCHEDULE_HTTP_BOARDS = 50
+SCHEDULE_BROWSER_BOARDS = 8
+# Longest the scheduler sleeps between checks for job boards that are due
+SCHEDULE_POLL_INTERVAL = 60
+
+# With --serve, the positions in the position store can be queried over HTTP on this port of localhost
+QUERY_SERVER_PORT = 8765
+# How often the query server checks the position store for runs that finished since its index was last updated
+QUERY_REFRESH_INTERVAL = 5
+# Positions in one page of query results by default, and at most
+QUERY_PAGE_SIZE = 50
+MAX_QUERY_PAGE_SIZE = 500
+# Number of queries whose results and compiled filters the query server keeps until its index changes, so paging through a query doesn't run it again
+QUERY_CACHE_SIZE = 32
+# Words of a position title that the title search looks up
+TITLE_WORDS = re.compile(r"\w+")
+
+# Number of pages of a Workday job board fetched at the same time
+WORKDAY_PAGE_WINDOW = 8
+# Number of postings Workday puts on each page of a job board, the limit its pagination end point pages by
+WORKDAY_PAGE_SIZE = 50
+
+# Number of scraped job boards that can wait to be filtered in streaming mode before scrapers are held back
+STREAM_QUEUE_SIZE = 16
+# Number of rows sorted in memory at a time when sorting the streamed CSV file
+SORT_CHUNK_SIZE = 10000
+
+# Default size of the Selenium browser pool, each browser is a full Chrome process so this caps memory use
+BROWSER_POOL_SIZE = 4
+MAX_JOBS_PER_BROWSER = 20
+
+# Timeouts for the Selenium wait helpers, kept short so a board that has stopped changing doesn't hold up its browser
+WAIT_TIMEOUT = 10
+WAIT_POLL_INTERVAL = 0.1
+LOAD_MORE_TIMEOUT = 3
+# How long a custom job board gets to show its job items, and the most pages of job items read from one board
+BOARD_LOAD_TIMEOUT = 20
+MAX_BOARD_PAGES = 200
+# How long no new network requests have to start for the page to count as idle
+NETWORK_IDLE_TIME = 0.5
+NETWORK_STATE_SCRIPT = """
+if (!window.jobScraperBufferResized) {
+    performance.setResourceTimingBufferSize(100000);
+    window.jobScraperBufferResized = true;
+}
+return [document.readyState, performance.getEntriesByType('resource').length, window.jQuery ? window.jQuery.active : 0];
+"""
+# Lists the links of the XHR and fetch requests the page has made
+DATA_REQUESTS_SCRIPT = """
+return performance.getEntriesByType('resource')
+    .filter((entry) => entry.initiatorType === 'xmlhttprequest' || entry.initiatorType === 'fetch')
+    .map((entry) => entry.name);
+"""
+# Reads [title, link, location] of every job item on the page in one go, with the selectors of the job board passed in as arguments[0]
+# Throws like find_element would when a job item has no title or link, so a broken board still fails instead of returning blank positions
+JOB_ITEMS_SCRIPT = """
+const board = arguments[0];
+const text = (element) => element.innerText.trim();
+const find = (parent, selector) => {
+    const element = parent.querySelector(selector);
+    if (element === null) {
+        throw new Error("No element matches " + selector);
+    }
+    return element;
+};
+
+const rows = [];
+const groups = board["Job Group"] ? document.querySelectorAll(board["Job Group"]) : [document];
+for (const group of groups) {
+    const groupLocation = board["Job Group Location"] ? text(find(group, board["Job Group Location"])) : null;
+
+    for (const job of group.querySelectorAll(board["Job Item"])) {
+        let location = groupLocation;
+        if (location === null) {
+            location = board["Job Item Location"] ? Array.from(job.querySelectorAll(board["Job Item Location"]), text).join(" ") : "";
+        }
+
+        const link = board["Job Item Link"] ? find(job, board["Job Item Link"]).href : job.href;
+        rows.push([text(find(job, board["Job Item Title"])), link === undefined ? null : link, location]);
+    }
+}
+return rows;
+"""
+
+
+SCRAPER_METRICS = ["Wall Time", "HTTP Requests", "Retries", "Bytes Downloaded", "Parse Time", "Browser Time", "Positions"]
+
+PROMETHEUS_SCRAPER_METRICS = [
+    ("Wall Time", "job_scraper_scraper_wall_seconds", "Wall time spent scraping the job board"),
+    ("HTTP Requests", "job_scraper_scraper_http_requests", "HTTP requests sent while scraping the job board"),
+    ("Retries", "job_scraper_scraper_retries", "HTTP requests retried while scraping the job board"),
+    ("Bytes Downloaded", "job_scraper_scraper_downloaded_bytes", "Bytes downloaded while scraping the job board"),
+    ("Parse Time", "job_scraper_scraper_parse_seconds", "Time spent parsing the job board's pages"),
+    ("Browser Time", "job_scraper_scraper_browser_seconds", "Time spent driving a browser on the job board"),
+    ("Positions", "job_scraper_scraper_positions", "Positions scraped from the job board")
+]
+
+
+# Collects timings and counters for every scraper, filter stage and pipeline step during a run
+# Requests and parse time are attributed to whichever scraper is set in current_scraper when they happen
+class RunMetrics:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.lock = threading.Lock()
+        self.started = datetime.now().isoformat()
+        self.start_time = time.perf_counter()
+        self.scrapers = {}
+        self.filters = {}
+        self.steps = {}
+
+    def add(self, metric, amount, scraper=None):
+        scraper = current_scraper.get() if scraper is None else scraper
+        with self.lock:
+            self.scrapers.setdefault(scraper, dict.fromkeys(SCRAPER_METRICS, 0))[metric] += amount
+
+    # Removes and returns a scraper's metrics, so a long running worker doesn't keep the metrics of every task it has run
+    def pop_scraper(self, scraper):
+        with self.lock:
+            return self.scrapers.pop(scraper, dict.fromkeys(SCRAPER_METRICS, 0))
+
+    def add_filter(self, stage, positions_in, positions_dropped):
+        with self.lock:
+            metrics = self.filters.setdefault(stage, {"Positions In": 0, "Positions Dropped": 0})
+            metrics["Positions In"] += positions_in
+            metrics["Positions Dropped"] += positions_dropped
+
+    def add_step_time(self, step, seconds):
+        with self.lock:
+            self.steps[step] = self.steps.get(step, 0) + seconds
+
+    # Times a pipeline step, like exporting, for the duration of a with block
+    @contextmanager
+    def time_step(self, step):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_step_time(step, time.perf_counter() - start)
 
+    def get_report(self):
+        with self.lock:
+            return {
+                "Started": self.started,
+                "Wall Time": time.perf_counter() - self.start_time,
+                "Totals": {metric: sum(metrics[metric] for metrics in self.scrapers.values()) for metric in SCRAPER_METRICS},
+                "Scrapers": {scraper: dict(metrics) for scraper, metrics in sorted(self.scrapers.items(), key=lambda item: -item[1]["Wall Time"])},
+                "Filters": {stage: dict(metrics) for stage, metrics in self.filters.items()},
+                "Steps": dict(self.steps)
+            }
 
-# Scrapes all positions from each Greenhouse job board in input list
-# Outputs each position with company name, position title, URL, and position location
-def get_positions_on_greenhouse(job_boards):
-    root_link = "https://boards.greenhouse.io/"
-    all_positions = []
+    def write_report(self, file_name=RUN_REPORT_FILE):
+        with open(file_name, "w") as f:
+            json.dump(self.get_report(), f, indent=2)
+
+    # Writes the report in the Prometheus text exposition format, e.g. for the node exporter's textfile collector
+    def write_prometheus(self, file_name):
+        report = self.get_report()
+        lines = []
+
+        for metric, name, description in PROMETHEUS_SCRAPER_METRICS:
+            lines += ["# HELP " + name + " " + description, "# TYPE " + name + " gauge"]
+            lines += [name + '{scraper="' + escape_prometheus_label(scraper) + '"} ' + str(metrics[metric]) for scraper, metrics in report["Scrapers"].items()]
+
+        for metric, name, description in [("Positions In", "job_scraper_filter_positions_in", "Positions that reached the filter stage"),
+                                          ("Positions Dropped", "job_scraper_filter_positions_dropped", "Positions dropped by the filter stage")]:
+            lines += ["# HELP " + name + " " + description, "# TYPE " + name + " gauge"]
+            lines += [name + '{stage="' + escape_prometheus_label(stage) + '"} ' + str(metrics[metric]) for stage, metrics in report["Filters"].items()]
+
+        lines += ["# HELP job_scraper_step_seconds Time spent in each step of the run", "# TYPE job_scraper_step_seconds gauge"]
+        lines += ['job_scraper_step_seconds{step="' + escape_prometheus_label(step) + '"} ' + str(seconds) for step, seconds in report["Steps"].items()]
+        lines += ["# HELP job_scraper_run_wall_seconds Wall time of the whole run", "# TYPE job_scraper_run_wall_seconds gauge",
+                  "job_scraper_run_wall_seconds " + str(report["Wall Time"])]
+
+        with open(file_name + ".tmp", "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(file_name + ".tmp", file_name)
+
+    # Prints the job boards that took the longest to scrape
+    def print_slowest_scrapers(self, count=5):
+        print("Slowest job boards:")
+        for scraper, metrics in list(self.get_report()["Scrapers"].items())[:count]:
+            print("\t{}: {:.1f}s, {} requests, {} positions".format(scraper, metrics["Wall Time"], metrics["HTTP Requests"], metrics["Positions"]))
+
+
+def escape_prometheus_label(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+# Name of the scraper the current task or thread is working for, so requests and parsing are counted against it
+current_scraper = contextvars.ContextVar("current_scraper", default="Unknown")
+run_metrics = RunMetrics()
+
+
+# Runs a job board scraper coroutine while timing it and attributing its requests to it
+async def measure_scraper(name, scraper):
+    current_scraper.set(name)
+    start = time.perf_counter()
+
+    try:
+        positions = await scraper
+    finally:
+        run_metrics.add("Wall Time", time.perf_counter() - start)
+
+    run_metrics.add("Positions", len(positions))
+    return positions
+
+
+# A scraped position, read like a dictionary of its CSV fields, e.g. position["Title"], so csv.DictWriter can write it as is
+# Slots make each position a fraction of the size of a dictionary, and company names and locations, which repeat across thousands of positions,
+# are interned so every position shares one copy. The lowercased title the filters match against is worked out once
+# Fields are copied into plain strings, lxml's text results would otherwise keep their whole parsed page alive
+# The key of the job board a position was scraped from is kept alongside its fields, but isn't one of them
+class Position:
+    __slots__ = ("company", "title", "link", "location", "lower_title", "board")
+    FIELDS = {"Company": "company", "Title": "title", "Link": "link", "Location": "location"}
+
+    def __init__(self, company, title, link, location, board=None):
+        self.company = None if company is None else sys.intern(str(company))
+        self.title = str(title)
+        self.link = None if link is None else str(link)
+        self.location = sys.intern(str(location))
+        self.lower_title = self.title.lower()
+        self.board = board
+
+    def __getitem__(self, field):
+        return getattr(self, Position.FIELDS[field])
+
+    def get(self, field, default=None):
+        return getattr(self, Position.FIELDS[field]) if field in Position.FIELDS else default
 
-    for job_board in job_boards:
-        print("\tScraping for " + job_board["Company"] + "...", end=" ", flush=True)
+    def keys(self):
+        return Position.FIELDS.keys()
 
-        page = requests.get(root_link + job_board["Company"].replace(" ", "").lower()) if "Link" not in job_board else requests.get(root_link + job_board["Link"])
-        sections = BeautifulSoup(page.text, 'html.parser').find_all("section", {"class": "level-0"})
+    def __eq__(self, other):
+        return isinstance(other, Position) and self.to_record() == other.to_record()
 
-        if len(sections) == 0:
-            print("ERROR:", job_board["Company"], "could not be scraped!")
+    def __hash__(self):
+        return hash(self.to_record())
+
+    def __repr__(self):
+        return "Position" + repr(self.to_record())
+
+    # Fields in CSV_FIELDS order
+    def to_record(self):
+        return (self.company, self.title, self.link, self.location)
+
+    def to_dict(self):
+        return dict(zip(CSV_FIELDS, self.to_record()))
+
+    # json.dump(..., default=Position.to_json) writes positions as objects of their CSV fields and their job board, if they have one,
+    # and json.load(..., object_hook=Position.from_json) reads them back into positions
+    @staticmethod
+    def to_json(value):
+        if isinstance(value, Position):
+            return value.to_dict() if value.board is None else dict(value.to_dict(), Board=value.board)
+        raise TypeError(repr(value) + " is not JSON serializable")
+
+    @staticmethod
+    def from_json(value):
+        if value.keys() - {"Board"} != Position.FIELDS.keys():
+            return value
+        return Position(value["Company"], value["Title"], value["Link"], value["Location"], value.get("Board"))
+
+
+# Remembers the validators, content hash and parsed result of each page fetched, keyed by URL and parser and kept on disk between runs
+class ResponseCache:
+    def __init__(self, file_name=RESPONSE_CACHE_FILE):
+        self.file_name = file_name
+        self.used_keys = set()
+
+        try:
+            with open(file_name) as f:
+                self.entries = json.load(f, object_hook=Position.from_json)
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+
+    def get(self, key):
+        self.used_keys.add(key)
+        return self.entries.get(key)
+
+    def put(self, key, entry):
+        self.used_keys.add(key)
+        self.entries[key] = entry
+
+    # Key of a page parsed by a parser, the parsed positions have the company name and links of the parser's arguments baked in,
+    # so the same page parsed for another company, or after a company is renamed, isn't given the other company's positions
+    @staticmethod
+    def get_key(link, parse):
+        if isinstance(parse, partial):
+            return json.dumps([link, parse.func.__name__, parse.args, parse.keywords], sort_keys=True)
+        return json.dumps([link, parse.__name__])
+
+    # Only keeps the pages used in this run, so boards that are no longer scraped drop out of the cache
+    def save(self):
+        with open(self.file_name + ".tmp", "w") as f:
+            json.dump({key: entry for key, entry in self.entries.items() if key in self.used_keys}, f, default=Position.to_json)
+        os.replace(self.file_name + ".tmp", self.file_name)
+
+
+# Raised instead of sending a request whose circuit is open because it keeps failing
+class CircuitOpenError(requests.exceptions.RequestException):
+    pass
+
+
+# Circuit breaks the requests one job board sends to a host
+# Job boards on a shared ATS host like boards-api.greenhouse.io each have their own circuit, so one broken job board doesn't cut off the rest
+# Once too many requests in a row have failed the circuit opens, then after a while a single trial request decides whether it closes again
+class CircuitBreaker:
+    def __init__(self, name):
+        self.name = name
+        self.failures = 0
+        self.open_until = None
+        self.trial_running = False
+
+    # Raises a CircuitOpenError while the circuit is open, once it has been open long enough lets a single trial request through
+    def check(self):
+        if self.open_until is None:
+            return
+        if time.monotonic() < self.open_until or self.trial_running:
+            raise CircuitOpenError(self.name + " keeps failing, not sending it any requests for now")
+        self.trial_running = True
+
+    def record_success(self):
+        self.failures = 0
+        self.open_until = None
+        self.trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_running = False
+        if self.failures >= CIRCUIT_FAILURE_THRESHOLD:
+            self.open_until = time.monotonic() + CIRCUIT_OPEN_TIME
+
+    # A throttled request ends a trial without counting as a failure, the host is up but wants us to slow down
+    def record_throttle(self):
+        self.trial_running = False
+
+
+# Rate limits and throttles the requests to a single host
+# A token bucket spaces out requests, and its rate adapts to the host: halved on every 429 or 503, raised a little on every success
+class HostLimiter:
+    def __init__(self, host, max_requests, request_rate=HOST_REQUEST_RATE):
+        self.host = host
+        self.concurrency = asyncio.Semaphore(max_requests)
+        self.request_rate = request_rate
+        self.max_request_rate = request_rate
+        self.tokens = HOST_REQUEST_BURST
+        self.updated = time.monotonic()
+        self.paused_until = 0
+
+    # Waits until the host isn't paused by a Retry-After and the token bucket has a token to spend
+    async def wait_for_turn(self):
+        while self.request_rate is not None:
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+
+            self.tokens = min(HOST_REQUEST_BURST, self.tokens + (now - self.updated) * self.request_rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.request_rate)
+
+    def record_success(self):
+        if self.request_rate is not None:
+            self.request_rate = min(self.max_request_rate, self.request_rate + HOST_REQUEST_RATE_INCREASE)
+
+    # Slows down the host after it throttled us, and pauses it entirely for as long as it asked in Retry-After
+    def record_throttle(self, retry_after):
+        if self.request_rate is not None:
+            self.request_rate = max(MIN_HOST_REQUEST_RATE, self.request_rate / 2)
+        if retry_after is not None:
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+
+# Reads how many seconds a response asks us to wait before trying again, Retry-After can be a number of seconds or a date
+def get_retry_after(page):
+    retry_after = page.headers.get("Retry-After")
+    if retry_after is None:
+        return None
+
+    try:
+        return max(0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        return max(0, (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+# Full jitter exponential backoff, a random wait of up to double the previous attempt's maximum
+def get_retry_backoff(attempt):
+    return random.uniform(0, min(MAX_RETRY_BACKOFF, RETRY_BACKOFF * 2 ** attempt))
+
+
+# Fetches pages concurrently with asyncio, sharing one connection-pooled requests session between all scrapers
+# Limits how many requests are in flight at once, both globally and for each host, and paces each host with its own HostLimiter
+# Each job board's requests to a host are circuit broken on their own, by the scraper the requests are counted against
+# Job board HTML is parsed in a pool of processes so parsing large boards uses every core instead of holding up the event loop
+class FetchEngine:
+    def __init__(self, max_concurrent_requests=MAX_CONCURRENT_REQUESTS, max_requests_per_host=MAX_REQUESTS_PER_HOST, cache=None,
+                 parse_processes=PARSE_PROCESSES, host_request_rate=HOST_REQUEST_RATE):
+        self.cache = cache
+        # Processes are spawned rather than forked, since forking copies the locks of the fetch threads in whatever state they're in
+        self.parse_pool = ProcessPoolExecutor(parse_processes, mp_context=multiprocessing.get_context("spawn")) if parse_processes > 1 else None
+        self.max_requests_per_host = max_requests_per_host
+        self.host_request_rate = host_request_rate
+        self.global_limit = asyncio.Semaphore(max_concurrent_requests)
+        self.host_limiters = {}
+        self.circuit_breakers = {}
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent_requests)
+
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=max_concurrent_requests, pool_maxsize=max_requests_per_host)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    # Sends a GET request once the host's limiter allows it and there is room under both the global and the per-host limit
+    # Retries timeouts, connection errors and transient statuses, and returns the last response if the retries run out
+    # Raises a RequestException if the request can't be sent at all, or a CircuitOpenError if the job board's requests to the host keep failing
+    async def get(self, link, headers=None):
+        host = urlparse(link).netloc
+        if host not in self.host_limiters:
+            self.host_limiters[host] = HostLimiter(host, self.max_requests_per_host, self.host_request_rate)
+        limiter = self.host_limiters[host]
+        circuit_key = (host, current_scraper.get())
+        if circuit_key not in self.circuit_breakers:
+            self.circuit_breakers[circuit_key] = CircuitBreaker(circuit_key[1] + " on " + host)
+        circuit = self.circuit_breakers[circuit_key]
+
+        for attempt in range(MAX_RETRIES + 1):
+            if attempt > 0:
+                run_metrics.add("Retries", 1)
+            circuit.check()
+            await limiter.wait_for_turn()
+
+            try:
+                async with self.global_limit, limiter.concurrency:
+                    run_metrics.add("HTTP Requests", 1)
+                    page = await asyncio.get_event_loop().run_in_executor(
+                        self.executor, partial(self.session.get, link, headers=headers, timeout=REQUEST_TIMEOUT))
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                circuit.record_failure()
+                if attempt == MAX_RETRIES:
+                    raise
+                await asyncio.sleep(get_retry_backoff(attempt))
+                continue
+            except requests.exceptions.RequestException:
+                circuit.record_failure()
+                raise
+
+            if page.status_code not in RETRY_STATUS_CODES:
+                limiter.record_success()
+                circuit.record_success()
+                break
+
+            retry_after = get_retry_after(page)
+            if page.status_code in THROTTLE_STATUS_CODES:
+                limiter.record_throttle(retry_after)
+            # A 429 means the host is up but wants us to slow down, every other retried status counts towards opening the circuit
+            if page.status_code == 429:
+                circuit.record_throttle()
+            else:
+                circuit.record_failure()
+            if attempt == MAX_RETRIES or (retry_after is not None and retry_after > MAX_RETRY_AFTER):
+                break
+            await asyncio.sleep(get_retry_backoff(attempt))
+
+        run_metrics.add("Bytes Downloaded", len(page.content))
+        return page
+
+    # Fetches a page and parses its text, reusing the cached result when the page hasn't changed since the last run
+    # Sends conditional requests so an unchanged page comes back as an empty 304, and skips parsing when the content hash matches
+    # If in_process is set, parse must return positions and is run in the parse pool
+    # Raises an HTTPError if the page can't be fetched
+    async def get_parsed(self, link, parse, headers=None, in_process=False):
+        cache_key = ResponseCache.get_key(link, parse)
+        entry = self.cache.get(cache_key) if self.cache is not None else None
+        request_headers = dict(headers or {})
+        if entry is not None and entry["ETag"] is not None:
+            request_headers["If-None-Match"] = entry["ETag"]
+        if entry is not None and entry["Last-Modified"] is not None:
+            request_headers["If-Modified-Since"] = entry["Last-Modified"]
+
+        page = await self.get(link, request_headers)
+        if entry is not None and page.status_code == 304:
+            return entry["Parsed"]
+        page.raise_for_status()
+
+        content_hash = hashlib.sha256(page.content).hexdigest()
+        if entry is not None and entry["Hash"] == content_hash:
+            parsed = entry["Parsed"]
         else:
-            for section in sections:
-                for position in section.find_all("div", {"class": "opening"}):
-                    all_positions.append({
-                        "Company": job_board["Company"],
-                        "Title": position.find("a").getText().strip(),
-                        "Link": ("" if position.find("a")['href'].startswith("https") else root_link[:-1]) + position.find("a")['href'],
-                        "Location": position.find("span", {"class": "location"}).getText().strip()
-                    })
+            start = time.perf_counter()
+            if in_process and self.parse_pool is not None:
+                parsed = [Position(*record) for record in await asyncio.get_event_loop().run_in_executor(
+                    self.parse_pool, partial(parse_positions_in_process, parse, page.content, page.encoding or "utf-8"))]
+            else:
+                parsed = parse(page.text)
+            run_metrics.add("Parse Time", time.perf_counter() - start)
+
+        if self.cache is not None:
+            self.cache.put(cache_key, {
+                "ETag": page.headers.get("ETag"),
+                "Last-Modified": page.headers.get("Last-Modified"),
+                "Hash": content_hash,
+                "Parsed": parsed
+            })
+
+        return parsed
+
+    def close(self):
+        self.session.close()
+        self.executor.shutdown()
+        if self.parse_pool is not None:
+            self.parse_pool.shutdown()
+
+
+# Runs in a parse process, decodes the raw page and parses it into compact records in CSV_FIELDS order
+# Tuples are much cheaper to send back to the parent process than a dictionary per position
+def parse_positions_in_process(parse, page_content, encoding):
+    return [tuple(position[field] for field in CSV_FIELDS) for position in parse(page_content.decode(encoding, errors="replace"))]
+
+
+# Runs a FetchEngine on an event loop in its own thread, so code running in ordinary threads, like the Selenium scrapers, can fetch through it
+# Requests share the engine's session, per-host limits, retries and circuit breakers, and are counted against the calling thread's scraper
+# The event loop and the engine are only started once the first page is fetched
+class ThreadedFetchEngine:
+    def __init__(self, max_concurrent_requests=MAX_CONCURRENT_REQUESTS, max_requests_per_host=MAX_REQUESTS_PER_HOST):
+        self.max_concurrent_requests = max_concurrent_requests
+        self.max_requests_per_host = max_requests_per_host
+        self.lock = threading.Lock()
+        self.loop = None
+        self.thread = None
+        self.engine = None
+
+    def start(self):
+        with self.lock:
+            if self.loop is None:
+                self.engine = FetchEngine(self.max_concurrent_requests, self.max_requests_per_host, parse_processes=1)
+                self.loop = asyncio.new_event_loop()
+                self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+                self.thread.start()
+
+    # Sends a GET request through the engine and blocks until it's done, raises the same errors as FetchEngine.get
+    def get(self, link, headers=None):
+        self.start()
+        scraper = current_scraper.get()
+
+        async def get():
+            current_scraper.set(scraper)
+            return await self.engine.get(link, headers)
+
+        return asyncio.run_coroutine_threadsafe(get(), self.loop).result()
+
+    def close(self):
+        with self.lock:
+            if self.loop is None:
+                return
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.loop.close()
+            self.engine.close()
+            self.loop = None
+
+
+# Runs the scrapers concurrently and joins all of their positions into one list
+# If emit is given, each scraper's positions are instead handed to emit as soon as that scraper finishes
+# emit may block, e.g. on a full queue, so it's called in a thread and only holds back handing over positions, not the event loop
+async def gather_positions(scrapers, emit=None):
+    all_positions = []
 
-            print("Done")
+    if emit is not None:
+        for scraper in asyncio.as_completed(scrapers):
+            positions = await scraper
+            await asyncio.get_event_loop().run_in_executor(None, emit, positions)
+        return all_positions
+
+    for positions in await asyncio.gather(*scrapers):
+        all_positions += positions
 
     return all_positions
 
 
-# Scrapes all positions from each Lever job board in input list
+# Finds the end of a Greenhouse or Lever job board's link, which defaults to the company name
+def get_board_path(job_board):
+    return job_board["Company"].replace(" ", "").lower() if "Link" not in job_board else job_board["Link"]
+
+
+# XPath condition matching elements that have a class, the same way BeautifulSoup matches a class
+def has_class(name):
+    return "contains(concat(' ', normalize-space(@class), ' '), ' " + name + " ')"
+
+
+# Selectors compiled once for lxml, each job board page is then only walked by compiled XPath
+if lxml_html is not None:
+    GREENHOUSE_OPENINGS = etree.XPath("//section[" + has_class("level-0") + "]//div[" + has_class("opening") + "]")
+    GREENHOUSE_OPENING_LINK = etree.XPath("(.//a)[1]")
+    GREENHOUSE_OPENING_LOCATION = etree.XPath("(.//span[" + has_class("location") + "])[1]")
+    LEVER_POSTINGS = etree.XPath("//div[" + has_class("posting") + "]")
+    LEVER_POSTING_TITLE = etree.XPath("(.//h5)[1]")
+    LEVER_POSTING_LINK = etree.XPath("(.//a[" + has_class("posting-title") + "])[1]")
+    LEVER_POSTING_LOCATION = etree.XPath("(.//span[" + has_class("sort-by-location") + "])[1]")
+    LEVER_POSTING_COMMITMENT = etree.XPath("(.//span[" + has_class("sort-by-commitment") + "])[1]")
+
+
+# Parses all positions from the HTML of a Greenhouse job board, relative links are joined onto the root link
+# Uses lxml if it's installed, otherwise BeautifulSoup
+def parse_greenhouse_html(page_text, company, root_link=GREENHOUSE_ROOT_LINK):
+    all_positions = []
+
+    if lxml_html is None:
+        for section in BeautifulSoup(page_text, 'html.parser').find_all("section", {"class": "level-0"}):
+            for position in section.find_all("div", {"class": "opening"}):
+                link = position.find("a")
+                all_positions.append(Position(
+                    company=company,
+                    title=link.getText().strip(),
+                    link=("" if link['href'].startswith("https") else root_link[:-1]) + link['href'],
+                    location=position.find("span", {"class": "location"}).getText().strip()
+                ))
+        return all_positions
+
+    for position in GREENHOUSE_OPENINGS(lxml_html.document_fromstring(page_text)):
+        link = GREENHOUSE_OPENING_LINK(position)[0]
+        all_positions.append(Position(
+            company=company,
+            title=link.text_content().strip(),
+            link=("" if link.get("href").startswith("https") else root_link[:-1]) + link.get("href"),
+            location=GREENHOUSE_OPENING_LOCATION(position)[0].text_content().strip()
+        ))
+
+    return all_positions
+
+
+# Maps the jobs from the Greenhouse boards API onto positions
+def parse_greenhouse_json(page_text, company):
+    return [Position(
+        company=company,
+        title=job["title"].strip(),
+        link=job["absolute_url"],
+        location=job["location"]["name"].strip() if job.get("location") else ""
+    ) for job in json.loads(page_text)["jobs"]]
+
+
+# Finds the board token used by the Greenhouse boards API, embedded job boards pass it in the 'for' query parameter
+def get_greenhouse_board_token(job_board):
+    board_path = get_board_path(job_board)
+    query = parse_qs(urlparse(board_path).query)
+
+    return query["for"][0] if "for" in query else board_path
+
+
+# Scrapes all positions from a single Greenhouse job board
+# Uses the Greenhouse boards API and only falls back to parsing the board's HTML if the API fails
 # Outputs each position with company name, position title, URL, and position location
-def get_positions_on_lever(job_boards):
-    root_link = "https://jobs.lever.co/"
+async def get_positions_on_greenhouse_board(engine, job_board, use_api=True):
+    all_positions = None
+
+    if use_api:
+        try:
+            all_positions = await engine.get_parsed(GREENHOUSE_API_ROOT_LINK + get_greenhouse_board_token(job_board) + "/jobs",
+                                                    partial(parse_greenhouse_json, company=job_board["Company"]), headers={"Accept": "application/json"})
+        except (requests.exceptions.RequestException, ValueError, KeyError, TypeError, AttributeError):
+            all_positions = None
+
+    if all_positions is None:
+        try:
+            all_positions = await engine.get_parsed(GREENHOUSE_ROOT_LINK + get_board_path(job_board),
+                                                    partial(parse_greenhouse_html, company=job_board["Company"], root_link=GREENHOUSE_ROOT_LINK), in_process=True)
+        except requests.exceptions.RequestException:
+            all_positions = []
+
+        if len(all_positions) == 0:
+            print("\tERROR:", job_board["Company"], "could not be scraped!")
+            return all_positions
+
+    print("\tScraping for " + job_board["Company"] + "... Done")
+    return all_positions
+
+
+# Scrapes all positions from each Greenhouse job board in input list concurrently
+async def get_positions_on_greenhouse(engine, job_boards, use_api=True):
+    return await gather_positions([get_positions_on_greenhouse_board(engine, job_board, use_api) for job_board in job_boards])
+
+
+# Parses all positions from the HTML of a Lever job board, adding the commitment to the title if there is one
+# Uses lxml if it's installed, otherwise BeautifulSoup
+def parse_lever_html(page_text, company):
     all_positions = []
 
-    for job_board in job_boards:
-        print("\tScraping for " + job_board["Company"] + "...", end=" ", flush=True)
+    if lxml_html is None:
+        for position in BeautifulSoup(page_text, 'html.parser').find_all("div", {"class": "posting"}):
+            commitment = position.find("span", {"class": "sort-by-commitment"})
+            all_positions.append(Position(
+                company=company,
+                title=position.find("h5").getText() + (" (" + commitment.getText() + ")" if commitment else ""),
+                link=position.find("a", {"class": "posting-title"})['href'],
+                location=position.find("span", {"class": "sort-by-location"}).getText()
+            ))
+        return all_positions
+
+    for position in LEVER_POSTINGS(lxml_html.document_fromstring(page_text)):
+        commitment = LEVER_POSTING_COMMITMENT(position)
+        all_positions.append(Position(
+            company=company,
+            title=LEVER_POSTING_TITLE(position)[0].text_content() + (" (" + commitment[0].text_content() + ")" if commitment else ""),
+            link=LEVER_POSTING_LINK(position)[0].get("href"),
+            location=LEVER_POSTING_LOCATION(position)[0].text_content()
+        ))
 
-        page = requests.get(root_link + job_board["Company"].replace(" ", "").lower()) if "Link" not in job_board else requests.get(root_link + job_board["Link"])
-        positions = BeautifulSoup(page.text, 'html.parser').find_all("div", {"class": "posting"})
+    return all_positions
 
-        if len(positions) == 0:
-            print("ERROR:", job_board["Company"], "could not be scraped!")
-        else:
-            for position in positions:
-                if position.find("span", {"class": "sort-by-commitment"}):
-                    all_positions.append({
-                        "Company": job_board["Company"],
-                        "Title": position.find("h5").getText() + " (" + position.find("span", {
-                            "class": "sort-by-commitment"}).getText() + ")",
-                        "Link": position.find("a", {"class": "posting-title"})['href'],
-                        "Location": position.find("span", {"class": "sort-by-location"}).getText()
-                    })
-                else:
-                    all_positions.append({
-                        "Company": job_board["Company"],
-                        "Title": position.find("h5").getText(),
-                        "Link": position.find("a", {"class": "posting-title"})['href'],
-                        "Location": position.find("span", {"class": "sort-by-location"}).getText()
-                    })
 
-            print("Done")
+# Maps the postings from the Lever postings API onto positions
+def parse_lever_json(page_text, company):
+    all_positions = []
+
+    for posting in json.loads(page_text):
+        categories = posting.get("categories") or {}
+        all_positions.append(Position(
+            company=company,
+            title=posting["text"] + (" (" + categories["commitment"] + ")" if categories.get("commitment") else ""),
+            link=posting["hostedUrl"],
+            location=categories.get("location", "")
+        ))
+
+    return all_positions
+
+
+# Scrapes all positions from a single Lever job board
+# Uses the Lever postings API and only falls back to parsing the board's HTML if the API fails
+# Outputs each position with company name, position title, URL, and position location
+async def get_positions_on_lever_board(engine, job_board, use_api=True):
+    all_positions = None
+
+    if use_api:
+        try:
+            all_positions = await engine.get_parsed(LEVER_API_ROOT_LINK + get_board_path(job_board) + "?mode=json",
+                                                    partial(parse_lever_json, company=job_board["Company"]), headers={"Accept": "application/json"})
+        except (requests.exceptions.RequestException, ValueError, KeyError, TypeError, AttributeError):
+            all_positions = None
+
+    if all_positions is None:
+        try:
+            all_positions = await engine.get_parsed(LEVER_ROOT_LINK + get_board_path(job_board), partial(parse_lever_html, company=job_board["Company"]), in_process=True)
+        except requests.exceptions.RequestException:
+            all_positions = []
+
+        if len(all_positions) == 0:
+            print("\tERROR:", job_board["Company"], "could not be scraped!")
+            return all_positions
 
+    print("\tScraping for " + job_board["Company"] + "... Done")
     return all_positions
 
 
+# Scrapes all positions from each Lever job board in input list concurrently
+async def get_positions_on_lever(engine, job_boards, use_api=True):
+    return await gather_positions([get_positions_on_lever_board(engine, job_board, use_api) for job_board in job_boards])
+
+
 # Helper function for get_positions_on_workday
 # Finds the location of a desired key
 def extract_key(elem, key):
@@ -94,533 +913,905 @@ def extract_key(elem, key):
 
 
 # Helper function for get_positions_on_workday
-# Scrapes the JSON of a given URL
-def get_request_to_dict(link, company_name):
-    req = Request(link)
-    req.add_header("Accept", "application/json,application/xml")
+# Parses one page of a Workday job board's JSON into its positions, the total number of postings and the pagination end point
+def parse_workday_page(page_text, company, base_url):
+    page_dict = json.loads(page_text)
+
+    pagination_end_point = None
+    for end_point in extract_key(page_dict, 'endPoints') or []:
+        if end_point['type'] == "Pagination":
+            pagination_end_point = base_url + end_point['uri'] + '/'
+            break
+
+    postings_list = extract_key(page_dict, 'listItems')
+    total = extract_key(page_dict, 'total')
+
+    return {
+        "Positions": None if postings_list is None else [Position(
+            company=company,
+            title=position["title"]["instances"][0]["text"],
+            link=base_url + position["title"]["commandLink"],
+            location=position["subtitles"][0]["instances"][0]["text"] if ", More..." not in position["subtitles"][0]["instances"][0]["text"] else position["subtitles"][0]["instances"][0]["text"][:position["subtitles"][0]["instances"][0]["text"].index(", More...")]
+        ) for position in postings_list],
+        "Total": total if isinstance(total, int) else None,
+        "Pagination End Point": pagination_end_point
+    }
+
+
+# Helper function for get_positions_on_workday
+# Scrapes one page of a Workday job board, returns None if the page could not be scraped
+# If checkpoint pages are given, a page scraped before the last run died is read from them instead
+async def get_workday_page(engine, link, company, base_url, pages=None):
+    page = pages.get(link) if pages is not None else None
+    if page is not None:
+        return page
 
     try:
-        raw_page = urlopen(req).read().decode()
-        page_dict = json.loads(raw_page)
-    except:
-        print("ERROR:", company_name, "could not be scraped!")
-        page_dict = {}
+        page = await engine.get_parsed(link, partial(parse_workday_page, company=company, base_url=base_url),
+                                       headers={"Accept": "application/json,application/xml"})
+    except (requests.exceptions.RequestException, ValueError, KeyError, TypeError, IndexError):
+        return None
 
-    return page_dict
+    if pages is not None:
+        pages.put(link, page)
+    return page
 
 
-# Scrapes all positions from each Workday job board in input list
+# Helper function for get_positions_on_workday
+# Fetches every page after the first concurrently, with at most a window of pages in flight, and returns them in order
+# If the first page doesn't say how many postings there are, fetches a window of pages at a time until one comes back short
+# of Workday's page size, a first page that is already short holds the whole board
+# Returns None if any of the pages could not be scraped, since the board's positions would otherwise be silently incomplete
+async def get_remaining_workday_pages(engine, company, base_url, first_page, pages=None):
+    page_size = len(first_page["Positions"])
+    window = asyncio.Semaphore(WORKDAY_PAGE_WINDOW)
+
+    async def get_page(offset):
+        async with window:
+            page = await get_workday_page(engine, first_page["Pagination End Point"] + str(offset), company, base_url, pages)
+        return None if page is None else page["Positions"] or []
+
+    if first_page["Total"] is not None:
+        remaining_pages = await asyncio.gather(*[get_page(offset) for offset in range(page_size, first_page["Total"], page_size)])
+        return None if None in remaining_pages else remaining_pages
+
+    if page_size < WORKDAY_PAGE_SIZE:
+        return []
+    remaining_pages = []
+    offset = page_size
+    while True:
+        # Pages after the first short page are past the end of the board, so it doesn't matter if they failed
+        for page in await asyncio.gather(*[get_page(offset + i * page_size) for i in range(WORKDAY_PAGE_WINDOW)]):
+            if page is None:
+                return None
+            if len(page) > 0:
+                remaining_pages.append(page)
+            if len(page) < page_size:
+                return remaining_pages
+        offset += WORKDAY_PAGE_WINDOW * page_size
+
+
+# Scrapes all positions from a single Workday job board
+# Reads the first page, then fetches the rest of the pages concurrently and merges them in order
+# If any page can't be scraped the whole board counts as failed, so it isn't checkpointed, diffed or scheduled as if it were complete
 # Outputs each position with company name, position title, URL, and position location
-def get_positions_on_workday(job_boards):
-    all_positions = []
+async def get_positions_on_workday_board(engine, job_board, pages=None):
+    base_url = "{0.scheme}://{0.netloc}".format(urlparse(job_board["Link"]))
 
-    for job_board in job_boards:
-        print("\tScraping for " + job_board["Company"] + "...", end=" ", flush=True)
+    first_page = await get_workday_page(engine, job_board["Link"], job_board["Company"], base_url, pages)
+    if first_page is None:
+        print("\tERROR:", job_board["Company"], "could not be scraped!")
+        return []
 
-        postings_page_dict = get_request_to_dict(job_board["Link"], job_board["Company"])
-        if len(postings_page_dict) > 0:
-            base_url = job_board["Link"][:job_board["Link"].index('.com') + 4]
-            pagination_end_point = base_url
-            for end_point in extract_key(postings_page_dict, 'endPoints'):
-                if end_point['type'] == "Pagination":
-                    pagination_end_point += end_point['uri'] + '/'
-                    break
+    all_pages = [] if first_page["Positions"] is None else [first_page["Positions"]]
+    if first_page["Positions"] and first_page["Pagination End Point"] is not None:
+        remaining_pages = await get_remaining_workday_pages(engine, job_board["Company"], base_url, first_page, pages)
+        if remaining_pages is None:
+            print("\tERROR:", job_board["Company"], "could not be scraped!")
+            return []
+        all_pages += remaining_pages
 
-            while True:
-                postings_list = extract_key(postings_page_dict, 'listItems')
-                if postings_list is None:
-                    break
+    print("\tScraping for " + job_board["Company"] + "... Done")
+    return [position for page in all_pages for position in page]
 
-                paginated_urls = []
-                for position in postings_list:
-                    paginated_urls.append({
-                        "Company": job_board["Company"],
-                        "Title": position["title"]["instances"][0]["text"],
-                        "Link": base_url + position["title"]["commandLink"],
-                        "Location": position["subtitles"][0]["instances"][0]["text"] if ", More..." not in position["subtitles"][0]["instances"][0]["text"] else position["subtitles"][0]["instances"][0]["text"][:position["subtitles"][0]["instances"][0]["text"].index(", More...")]
-                    })
 
-                all_positions += paginated_urls
-                postings_page_dict = get_request_to_dict(pagination_end_point + str(len(all_positions)), job_board["Company"])
+# Scrapes all positions from each Workday job board in input list concurrently
+async def get_positions_on_workday(engine, job_boards):
+    return await gather_positions([get_positions_on_workday_board(engine, job_board) for job_board in job_boards])
 
-            print("Done")
 
-    return all_positions
+ATS_NAMES = {"greenhouse": "Greenhouse", "lever": "Lever", "workday": "Workday"}
 
 
-# Scrapes all positions from companies that use a custom job board
-# Outputs each position with company name, position title, URL, and position location
-def get_positions_using_selenium(job_boards):
-    all_positions = []
+# Names a Greenhouse, Lever or Workday job board for the run report
+def get_ats_board_name(ats, job_board):
+    return ATS_NAMES[ats] + ": " + job_board["Company"]
 
-    options = webdriver.ChromeOptions()
-    options.add_argument("--headless")
-    options.add_argument("window-size=2880,1800")
 
-    for job_board in job_boards:
-        print("\tScraping for " + job_board.get("Company Name") + "...", end=" ", flush=True)
+# Scrapes a single Greenhouse, Lever or Workday job board while timing it
+async def get_positions_on_ats_board(engine, ats, job_board, use_ats_apis=True, checkpoint=None):
+    name = get_ats_board_name(ats, job_board)
+    key = get_board_key(ats, job_board)
+    positions = checkpoint.get_board(key) if checkpoint is not None else None
+    if positions is not None:
+        print("\tResuming " + name + " from the checkpoint")
+        return set_board(positions, key)
 
-        browser = webdriver.Chrome(executable_path='./chromedriver', options=options)
-        browser.get(job_board.get("Careers Website"))
+    if ats == "greenhouse":
+        scraper = get_positions_on_greenhouse_board(engine, job_board, use_ats_apis)
+    elif ats == "lever":
+        scraper = get_positions_on_lever_board(engine, job_board, use_ats_apis)
+    else:
+        scraper = get_positions_on_workday_board(engine, job_board, checkpoint.pages(key) if checkpoint is not None else None)
 
-        browser.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+    positions = set_board(await measure_scraper(name, scraper), key)
+    if checkpoint is not None:
+        checkpoint.put_board(key, name, positions)
+    return positions
+
+
+# Scrapes every Greenhouse, Lever and Workday job board in parallel on one shared fetch engine
+# Pages that haven't changed since the last run are served from the response cache unless use_cache is turned off
+# If emit is given, each job board's positions are handed to emit as soon as that board is scraped
+# If a checkpoint is given, job boards and Workday pages already scraped before the last run died are read from it instead
+async def get_positions_on_ats(all_companies, max_concurrent_requests, max_requests_per_host, use_ats_apis=True, use_cache=True, emit=None,
+                               parse_processes=PARSE_PROCESSES, checkpoint=None):
+    cache = ResponseCache() if use_cache else None
+    engine = FetchEngine(max_concurrent_requests, max_requests_per_host, cache, parse_processes)
+
+    try:
+        return await gather_positions(
+            [get_positions_on_ats_board(engine, ats, job_board, use_ats_apis, checkpoint) for ats in ATS_NAMES for job_board in all_companies[ats]], emit)
+    finally:
+        engine.close()
+        if cache is not None:
+            cache.save()
+
+
+# Chrome options used for a job board, browsers launched with the same profile are reused between boards
+# Job boards only override the options they need, everything else comes from the default profile
+DEFAULT_BROWSER_PROFILE = {"headless": True, "window_size": "1280,800", "block_resources": ["images", "media", "fonts", "stylesheets", "analytics"]}
+
+# URL patterns of each kind of resource a browser profile can block, none of them are needed to read a job board
+BLOCKED_RESOURCE_PATTERNS = {
+    "images": ["*." + extension + suffix for extension in ["png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico", "bmp"] for suffix in ["", "?*"]],
+    "media": ["*." + extension + suffix for extension in ["mp4", "webm", "mov", "mp3", "m4a", "ogg", "wav"] for suffix in ["", "?*"]],
+    "fonts": ["*." + extension + suffix for extension in ["woff", "woff2", "ttf", "otf", "eot"] for suffix in ["", "?*"]],
+    "stylesheets": ["*.css", "*.css?*"],
+    "analytics": ["*://*" + domain + "/*" for domain in [
+        "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com", "facebook.net", "hotjar.com", "segment.com",
+        "segment.io", "optimizely.com", "newrelic.com", "nr-data.net", "fullstory.com", "mixpanel.com", "amplitude.com", "bat.bing.com",
+        "ads.linkedin.com", "snap.licdn.com", "hs-analytics.net", "quantserve.com", "scorecardresearch.com", "adsrvr.org", "clarity.ms"
+    ]]
+}
+
+
+# Browser profile a custom job board needs, boards that need a browser with a window or a bigger viewport set their own options
+def get_browser_profile(job_board):
+    return dict(DEFAULT_BROWSER_PROFILE, **job_board.get("Browser Profile", {}))
+
+
+# Launches a Chrome browser with the options from the given browser profile
+# Headless browsers use Chrome's new headless mode, which renders pages the same as a browser with a window
+def launch_browser(profile):
+    options = webdriver.ChromeOptions()
+    if profile.get("headless", True):
+        options.add_argument("--headless=new")
+    options.add_argument("window-size=" + profile["window_size"])
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--mute-audio")
+    if "images" in profile.get("block_resources", []):
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+
+    return webdriver.Chrome(executable_path='./chromedriver', options=options)
+
+
+# Stops the browser from downloading the kinds of resources the profile blocks
+# Blocking only applies to the current tab, so it's set up again every time a browser is lent out with a fresh tab
+def block_resources(browser, profile):
+    patterns = [pattern for kind in profile.get("block_resources", []) for pattern in BLOCKED_RESOURCE_PATTERNS[kind]]
+    if len(patterns) == 0:
+        return
 
+    try:
+        browser.execute_cdp_cmd("Network.enable", {})
+        browser.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    except WebDriverException:
+        pass
+
+
+# A browser owned by a BrowserPool along with the profile it was launched with
+class PooledBrowser:
+    def __init__(self, profile_key, browser):
+        self.profile_key = profile_key
+        self.browser = browser
+        self.jobs_run = 0
+
+
+# Keeps up to pool size Chrome browsers alive and lends them out to Selenium scrapers
+# Browsers are health checked before being lent out, get a fresh tab after each job and are relaunched after max jobs per browser
+class BrowserPool:
+    def __init__(self, size=BROWSER_POOL_SIZE, max_jobs_per_browser=MAX_JOBS_PER_BROWSER):
+        self.size = size
+        self.max_jobs_per_browser = max_jobs_per_browser
+        self.idle = []
+        self.launched = 0
+        self.condition = threading.Condition()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Lends out a browser with the given profile for the duration of a with block
+    @contextmanager
+    def browser(self, profile=DEFAULT_BROWSER_PROFILE):
+        pooled = self.acquire(profile)
         try:
-            WebDriverWait(browser, 20).until(EC.visibility_of_element_located((By.CSS_SELECTOR, job_board.get("Job Item"))))
+            block_resources(pooled.browser, profile)
+            yield pooled.browser
+        finally:
+            self.release(pooled)
+
+    # Takes an idle browser with a matching profile or launches a new one, waiting while the pool is full
+    def acquire(self, profile):
+        profile_key = json.dumps(profile, sort_keys=True)
+        retired = []
+
+        with self.condition:
+            while True:
+                pooled = next((pooled for pooled in self.idle if pooled.profile_key == profile_key), None)
+                if pooled is not None:
+                    self.idle.remove(pooled)
+                    break
+                if self.launched >= self.size and len(self.idle) > 0:
+                    # make room for this profile by retiring an idle browser launched with another profile
+                    retired.append(self.idle.pop(0))
+                    self.launched -= 1
+                if self.launched < self.size:
+                    self.launched += 1
+                    break
+                self.condition.wait()
 
-            if job_board.get("Prereq Clicks") is not None:
-                browser.find_element_by_xpath(job_board.get("Prereq Clicks")).click()
+        for stale in retired:
+            quit_browser(stale.browser)
 
-            for job in browser.find_elements_by_css_selector(job_board.get("Job Item")):
-                all_positions.append({
-                    "Company": job_board.get("Company Name"),
-                    "Title": job.find_element_by_css_selector(job_board.get("Job Item Title")).text,
-                    "Link": job.get_attribute("href") if job_board.get("Job Item Link") is None else job.find_element_by_css_selector(job_board.get("Job Item Link")).get_attribute("href"),
-                    "Location": "" if job_board.get("Job Item Location") is None else ' '.join([location.text for location in job.find_elements_by_css_selector(job_board.get("Job Item Location"))])
-                })
+        if pooled is not None and is_browser_healthy(pooled.browser):
+            return pooled
+        if pooled is not None:
+            quit_browser(pooled.browser)
 
-            print("Done")
+        try:
+            return PooledBrowser(profile_key, launch_browser(profile))
         except:
-            print("ERROR:", job_board.get("Company Name"), "could not be scraped!")
+            self.discard()
+            raise
+
+    # Returns a browser to the pool with a fresh tab, or quits it if it's worn out or broken
+    def release(self, pooled):
+        pooled.jobs_run += 1
+
+        if pooled.jobs_run >= self.max_jobs_per_browser or not recycle_tab(pooled.browser):
+            quit_browser(pooled.browser)
+            self.discard()
+        else:
+            with self.condition:
+                self.idle.append(pooled)
+                self.condition.notify()
+
+    # Frees up the slot of a browser that has been quit
+    def discard(self):
+        with self.condition:
+            self.launched -= 1
+            self.condition.notify()
+
+    def close(self):
+        with self.condition:
+            idle, self.idle = self.idle, []
+            self.launched -= len(idle)
 
+        for pooled in idle:
+            quit_browser(pooled.browser)
+
+
+# Checks that a browser is still responding to commands
+def is_browser_healthy(browser):
+    try:
+        browser.execute_script("return 1;")
+        return True
+    except WebDriverException:
+        return False
+
+
+# Replaces all open tabs with a single blank tab and clears the browser's data so the next job starts clean
+# delete_all_cookies would only clear the blank tab's cookies, so every cookie is cleared through CDP,
+# along with the local storage, caches and service workers of every site the old tabs were on
+def recycle_tab(browser):
+    try:
+        old_tabs = browser.window_handles
+        browser.execute_script("window.open('about:blank', '_blank');")
+        new_tab = [tab for tab in browser.window_handles if tab not in old_tabs][0]
+
+        origins = set()
+        for tab in old_tabs:
+            browser.switch_to.window(tab)
+            url = urlparse(browser.current_url)
+            if url.scheme in ("http", "https"):
+                origins.add(url.scheme + "://" + url.netloc)
+            browser.close()
+
+        browser.switch_to.window(new_tab)
+        browser.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        for origin in origins:
+            browser.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+        return True
+    except (WebDriverException, IndexError):
+        return False
+
+
+def quit_browser(browser):
+    try:
         browser.quit()
+    except WebDriverException:
+        pass
+
+
+# Runs a Selenium scraper on a browser borrowed from the pool
+# Times the job, and the part of it spent driving the browser, against the job's name
+# If data sources are given, custom job boards with a working data source are scraped over HTTP without borrowing a browser,
+# and the data source of every other custom job board is looked for while its browser is still on the page
+# If a checkpoint is given, job boards and pages already scraped before the last run died are read from it instead
+def run_with_pooled_browser(pool, job, data_sources=None, checkpoint=None):
+    scraper, argument, profile = job
+    name = get_job_name(job)
+    key = get_board_key("selenium", argument)
+    positions = checkpoint.get_board(key) if checkpoint is not None else None
+    if positions is not None:
+        print("\tResuming " + name + " from the checkpoint")
+        return set_board(positions, key)
+
+    current_scraper.set(name)
+    start = time.perf_counter()
+    uses_data_sources = data_sources is not None and scraper is get_positions_on_selenium_board
+
+    try:
+        positions = get_positions_from_data_source(data_sources, argument) if uses_data_sources else None
+        if positions is None:
+            with pool.browser(profile) as browser:
+                browser_start = time.perf_counter()
+                try:
+                    positions = scraper(browser, argument, checkpoint.pages(key) if checkpoint is not None else None)
+                    if uses_data_sources:
+                        discover_data_source(data_sources, browser, argument, positions)
+                finally:
+                    run_metrics.add("Browser Time", time.perf_counter() - browser_start)
+    finally:
+        run_metrics.add("Wall Time", time.perf_counter() - start)
+
+    run_metrics.add("Positions", len(set_board(positions, key)))
+    if checkpoint is not None:
+        checkpoint.put_board(key, name, positions)
+    return positions
+
+
+# Names a Selenium job for the run report
+def get_job_name(job):
+    scraper, argument, profile = job
+    return "Selenium: " + argument["Company Name"] if scraper is get_positions_on_selenium_board else scraper.__name__
+
+
+# Dispatches Selenium scrapers across the browser pool, running as many in parallel as the pool has browsers
+# Each job is a tuple of the scraper function, its argument and the browser profile it needs
+# If emit is given, each job's positions are handed to emit as soon as that job finishes
+def get_positions_using_selenium(pool, jobs, emit=None, data_sources=None, checkpoint=None):
+    all_positions = []
+
+    with ThreadPoolExecutor(max_workers=pool.size) as executor:
+        if emit is not None:
+            for job in as_completed([executor.submit(run_with_pooled_browser, pool, job, data_sources, checkpoint) for job in jobs]):
+                emit(job.result())
+            return all_positions
+
+        for positions in executor.map(partial(run_with_pooled_browser, pool, data_sources=data_sources, checkpoint=checkpoint), jobs):
+            all_positions += positions
 
     return all_positions
 
 
-# Scrapes all positions from Apple's job board
+# Scrapes all positions from a company that uses a custom job board described in selenium_companies.json
+# Every custom job board runs through this one engine: it waits for the board to load, makes the prereq clicks, applies the board's filters
+# and then reads the job items on every page of the board
+# If checkpoint pages are given, pages scraped before the last run died are clicked past instead of being read again
 # Outputs each position with company name, position title, URL, and position location
-def scrape_apple_positions(link):
-    print("\tScraping for Apple...", end=" ", flush=True)
-    all_positions = []
+def get_positions_on_selenium_board(browser, job_board, pages=None):
+    browser.get(job_board["Careers Website"])
 
-    options = webdriver.ChromeOptions()
-    options.add_argument("window-size=2880,1800")
+    browser.execute_script("window.scrollTo(0, document.body.scrollHeight);")
 
-    browser = webdriver.Chrome(executable_path='./chromedriver', options=options)
-    browser.get(link)
+    try:
+        wait_for_job_items(browser, job_board)
 
-    while True:
-        try:
-            WebDriverWait(browser, 20).until(EC.visibility_of_element_located((By.CSS_SELECTOR, "#active-search-results")))
+        for prereq_click in get_prereq_clicks(job_board):
+            browser.find_element_by_xpath(prereq_click).click()
 
-            for job in browser.find_elements_by_css_selector("table > tbody"):
-                all_positions.append({
-                    "Company": "Apple",
-                    "Title": job.find_element_by_css_selector("tr > td.table-col-1 > a").text,
-                    "Link": job.find_element_by_css_selector("tr > td.table-col-1 > a").get_attribute("href"),
-                    "Location": job.find_element_by_css_selector("tr > td.table-col-2 > span").text
-                })
+        apply_filters(browser, job_board)
+        all_positions = scrape_all_pages(browser, job_board, pages)
 
-            if "disabled" in browser.find_element_by_css_selector("nav.pagination > ul > li.pagination__next span.next").get_attribute("class"):
-                break
-            else:
-                browser.find_element_by_css_selector("nav.pagination > ul > li.pagination__next").click()
-        except:
-            print("ERROR: Apple could not be scraped!")
-            all_positions = []
-            break
-
-    if len(all_positions) > 0:
-        print("Done")
+        print("\tScraping for " + job_board["Company Name"] + "... Done")
+    except:
+        print("\tERROR:", job_board["Company Name"], "could not be scraped!")
+        all_positions = []
 
-    browser.quit()
     return all_positions
 
 
-# Scrapes all positions from Coda's job postings on LinkedIn
-# Outputs each position with company name, position title, URL, and position location
-def scrape_coda_positions(link):
-    print("\tScraping for Coda...", end=" ", flush=True)
-    all_positions = []
+# Prereq Clicks is either a single XPath or a list of XPaths clicked in order
+def get_prereq_clicks(job_board):
+    prereq_clicks = job_board.get("Prereq Clicks", [])
+    return [prereq_clicks] if isinstance(prereq_clicks, str) else prereq_clicks
 
-    options = webdriver.ChromeOptions()
-    options.add_argument("--headless")
-    options.add_argument("window-size=2880,1800")
 
-    browser = webdriver.Chrome(executable_path='./chromedriver', options=options)
-    browser.get(link)
+# Counts the elements on the page that match a CSS selector
+def count_elements(browser, selector):
+    return len(browser.find_elements_by_css_selector(selector))
+
 
+# Waits until the number of rows matching the selector is no longer count
+# Returns whether the row count changed before the timeout
+def wait_for_row_count_change(browser, selector, count, timeout=WAIT_TIMEOUT):
     try:
-        WebDriverWait(browser, 20).until(EC.visibility_of_element_located((By.CSS_SELECTOR, "ul.jobs-search__results-list")))
-
-        for job in browser.find_elements_by_css_selector("ul.jobs-search__results-list > li.job-result-card"):
-            all_positions.append({
-                "Company": "Coda",
-                "Title": job.find_element_by_css_selector("div.job-result-card__contents > h3.job-result-card__title").text,
-                "Link": job.find_element_by_css_selector("a.result-card__full-card-link").get_attribute("href")[:job.find_element_by_css_selector("a.result-card__full-card-link").get_attribute("href").index("?")],
-                "Location": job.find_element_by_css_selector("div.job-result-card__contents > div.job-result-card__meta > span.job-result-card__location").text
-            })
-    except:
-        print("ERROR: Coda could not be scraped!")
+        WebDriverWait(browser, timeout, poll_frequency=WAIT_POLL_INTERVAL).until(lambda browser: count_elements(browser, selector) != count)
+        return True
+    except TimeoutException:
+        return False
 
-    if len(all_positions) > 0:
-        print("Done")
 
-    browser.quit()
-    return all_positions
+# Waits until the page has loaded and no new network requests have started for the idle time
+# Returns whether the network went idle before the timeout
+def wait_for_network_idle(browser, timeout=WAIT_TIMEOUT, idle_time=NETWORK_IDLE_TIME):
+    last_activity = {"Requests": None, "Time": time.monotonic()}
 
+    def is_network_idle(browser):
+        ready_state, request_count, active_requests = browser.execute_script(NETWORK_STATE_SCRIPT)
+        if ready_state != "complete" or active_requests > 0 or request_count != last_activity["Requests"]:
+            last_activity["Requests"], last_activity["Time"] = request_count, time.monotonic()
+            return False
+        return time.monotonic() - last_activity["Time"] >= idle_time
 
-# Scrapes all positions from EA's job board
-# Outputs each position with company name, position title, URL, and position location
-def scrape_ea_positions(link):
-    print("\tScraping for Electronic Arts...", end=" ", flush=True)
-    all_positions = []
+    try:
+        WebDriverWait(browser, timeout, poll_frequency=WAIT_POLL_INTERVAL).until(is_network_idle)
+        return True
+    except TimeoutException:
+        return False
 
-    options = webdriver.ChromeOptions()
-    options.add_argument("--headless")
-    options.add_argument("window-size=2880,1800")
 
-    browser = webdriver.Chrome(executable_path='./chromedriver', options=options)
-    browser.get(link)
+# Waits until the element has been removed from the page, e.g. when a page of results is replaced by the next one
+# Returns whether the element went stale before the timeout
+def wait_for_staleness(browser, element, timeout=WAIT_TIMEOUT):
+    try:
+        WebDriverWait(browser, timeout, poll_frequency=WAIT_POLL_INTERVAL).until(EC.staleness_of(element))
+        return True
+    except TimeoutException:
+        return False
 
-    total_page_count = int(browser.find_element_by_css_selector("div.pagination > a:nth-child(3)").get_attribute("data-page"))
 
-    for page in range(1, total_page_count + 1):
-        # wait for results to load
-        try:
-            WebDriverWait(browser, 20).until(EC.visibility_of_element_located((By.CSS_SELECTOR, ".search-results-view.loading-context")))
-
-            # scrape all positions from the current page
-            for job in browser.find_elements_by_css_selector("div.search-results-view.loading-context tbody > tr"):
-                all_positions.append({
-                    "Company": "Electronic Arts",
-                    "Title": job.find_element_by_css_selector("td:nth-child(2)").text,
-                    "Link": job.find_element_by_css_selector("td:nth-child(1) > a").get_attribute("href"),
-                    "Location": job.find_element_by_css_selector("td:nth-child(4)").text
-                })
-
-            # move to next page
-            if page == 1:
-                browser.find_element_by_css_selector("div.pagination > a:nth-child(4)").click()
-            elif page < total_page_count:
-                browser.find_element_by_css_selector("div.pagination > a:nth-child(5)").click()
-            time.sleep(1)
+# Finds the first row matching the selector, or None if there are no rows
+def get_first_row(browser, selector):
+    rows = browser.find_elements_by_css_selector(selector)
+    return rows[0] if len(rows) > 0 else None
 
-        except:
-            print("ERROR: Electronic Arts (page ", page, ") could not be scraped!", sep="")
-            all_positions = []
-            break
 
-    if len(all_positions) > 0:
-        print("Done")
+# Waits for a page of results to be replaced after clicking to another page
+# Falls back to waiting for the network to go idle for boards that update their rows in place or had no rows
+def wait_for_page_change(browser, old_row, timeout=WAIT_TIMEOUT):
+    if old_row is None or not wait_for_staleness(browser, old_row, timeout):
+        wait_for_network_idle(browser, timeout)
 
-    browser.quit()
-    return all_positions
 
+# Scrolls to the bottom of the page until scrolling stops loading more rows
+# Returns the final number of rows
+def scroll_until_stable(browser, row_selector, timeout=LOAD_MORE_TIMEOUT):
+    count = count_elements(browser, row_selector)
 
-# Scrapes all positions from Hulu's job board
-# Outputs each position with company name, position title, URL, and position location
-def scrape_hulu_positions(link):
-    print("\tScraping for Hulu...", end=" ", flush=True)
-    all_positions = []
+    while True:
+        browser.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        if not wait_for_row_count_change(browser, row_selector, count, timeout):
+            return count
+        count = count_elements(browser, row_selector)
 
-    options = webdriver.ChromeOptions()
-    options.add_argument("--headless")
-    options.add_argument("window-size=2880,1800")
 
-    browser = webdriver.Chrome(executable_path='./chromedriver', options=options)
-    browser.get(link)
+# Clicks a 'load more' button until it disappears or clicking it stops loading more rows
+# Returns the final number of rows
+def click_until_stable(browser, button_selector, row_selector, timeout=LOAD_MORE_TIMEOUT):
+    count = count_elements(browser, row_selector)
+
+    while True:
+        buttons = [button for button in browser.find_elements_by_css_selector(button_selector) if button.is_displayed()]
+        if len(buttons) == 0:
+            return count
+
+        browser.execute_script("arguments[0].click();", buttons[0])
+        if not wait_for_row_count_change(browser, row_selector, count, timeout):
+            return count
+        count = count_elements(browser, row_selector)
 
+
+# Clicks an element, falling back to clicking it from JavaScript when it's covered by another element or scrolled out of view
+def click_element(browser, element):
     try:
-        WebDriverWait(browser, 20).until(EC.visibility_of_element_located((By.ID, "positions")))
-
-        browser.find_element_by_css_selector("#category_filters > div:nth-child(16)").click()
-
-        prev_height = 0
-        new_height = int(browser.execute_script("return document.body.scrollHeight"))
-        while prev_height < new_height:
-            browser.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(1)
-            prev_height = new_height
-            new_height = int(browser.execute_script("return document.body.scrollHeight"))
-
-        for job in browser.find_elements_by_css_selector("#positions > .job-listing"):
-            all_positions.append({
-                "Company": "Hulu",
-                "Title": job.find_element_by_css_selector(".job-info > h4 > a").text,
-                "Link": job.find_element_by_css_selector(".job-info > h4 > a").get_attribute("href"),
-                "Location": job.find_element_by_css_selector(".job-info > span:nth-child(6)").text
-            })
-    except:
-        print("ERROR: Hulu could not be scraped!")
+        element.click()
+    except WebDriverException:
+        browser.execute_script("arguments[0].click();", element)
 
-    if len(all_positions) > 0:
-        print("Done")
 
-    browser.quit()
-    return all_positions
+# Waits until the job board's Wait For element, or its first job item if it doesn't set one, is visible
+def wait_for_job_items(browser, job_board):
+    WebDriverWait(browser, BOARD_LOAD_TIMEOUT).until(
+        EC.visibility_of_element_located((By.CSS_SELECTOR, job_board.get("Wait For", job_board["Job Item"]))))
 
 
-# Scrapes all positions from LinkedIn's job board
-# Outputs each position with company name, position title, URL, and position location
-def scrape_linkedin_positions(link):
-    print("\tScraping for LinkedIn...", end=" ", flush=True)
-    all_positions = []
+# Applies each of the job board's filters in order, e.g. picking a job category or a country
+# A filter clicks its Click element, e.g. to open a dropdown, then clicks every element matching Options whose text is in Option Texts,
+# or only the first one if it has no Option Texts. Filters that reload the results set Wait For Page Change
+def apply_filters(browser, job_board):
+    for board_filter in job_board.get("Filters", []):
+        first_row = get_first_row(browser, job_board["Job Item"])
 
-    options = webdriver.ChromeOptions()
-    options.add_argument("--headless")
-    options.add_argument("window-size=2880,1800")
+        if "Click" in board_filter:
+            click_element(browser, browser.find_element_by_css_selector(board_filter["Click"]))
 
-    browser = webdriver.Chrome(executable_path='./chromedriver', options=options)
-    browser.get(link)
+        if "Options" in board_filter:
+            options = browser.find_elements_by_css_selector(board_filter["Options"])
+            if "Option Texts" in board_filter:
+                options = [option for option in options if option.get_attribute("textContent").strip() in board_filter["Option Texts"]]
+            else:
+                options = options[:1]
 
-    try:
-        WebDriverWait(browser, 20).until(EC.visibility_of_element_located((By.CSS_SELECTOR, "ul.jobs-search__results-list")))
+            for option in options:
+                click_element(browser, option)
 
-        while True:
-            try:
-                browser.find_element_by_css_selector("button.see-more-jobs").click()
-                time.sleep(0.5)
-            except:
-                break
+        if board_filter.get("Wait For Page Change", False):
+            wait_for_page_change(browser, first_row)
+            wait_for_job_items(browser, job_board)
 
-        for job in browser.find_elements_by_css_selector(".jobs-search__results-list > li.job-result-card"):
-            all_positions.append({
-                "Company": "LinkedIn",
-                "Title": job.find_element_by_css_selector(".result-card__contents > h3.result-card__title").text,
-                "Link": job.find_element_by_css_selector("a.result-card__full-card-link").get_attribute("href")[:job.find_element_by_css_selector("a.result-card__full-card-link").get_attribute("href").index("?")],
-                "Location": job.find_element_by_css_selector(".result-card__contents > .result-card__meta > span.job-result-card__location").text
-            })
-    except:
-        print("ERROR: LinkedIn could not be scraped!")
 
-    if len(all_positions) > 0:
-        print("Done")
+# Reads the job items on every page of the job board, following its Pagination:
+#   "Infinite Scroll" scrolls to the bottom until no more job items load
+#   "Load More" clicks the Load More button until no more job items load
+#   "Next Button" clicks the Next button until it's gone or it (or Next Disabled) has a disabled class
+#   "Numbered" clicks the link in Page Links numbered one past the current page until there isn't one
+def scrape_all_pages(browser, job_board, pages=None):
+    pagination = job_board.get("Pagination", {})
+    all_positions = []
+
+    if pagination.get("Type") == "Infinite Scroll":
+        scroll_until_stable(browser, job_board["Job Item"])
+    elif pagination.get("Type") == "Load More":
+        click_until_stable(browser, pagination["Load More"], job_board["Job Item"])
+
+    for page in range(1, MAX_BOARD_PAGES + 1):
+        positions = pages.get(str(page)) if pages is not None else None
+        if positions is None:
+            positions = scrape_job_items(browser, job_board)
+            if pages is not None:
+                pages.put(str(page), positions)
+        all_positions += positions
+
+        next_page = get_next_page_link(browser, pagination, page)
+        if next_page is None:
+            break
+
+        # move to next page and wait for the current page's rows to be replaced
+        first_row = get_first_row(browser, job_board["Job Item"])
+        click_element(browser, next_page)
+        wait_for_page_change(browser, first_row)
+        wait_for_job_items(browser, job_board)
 
-    browser.quit()
     return all_positions
 
 
-# Scrapes all positions from Rockstar Game's job board
-# Outputs each position with company name, position title, URL, and position location
-def scrape_rockstar_positions(links):
-    print("\tScraping for Rockstar Games...", end=" ", flush=True)
-    all_positions = []
+# Finds the element to click to get to the page after the given one, or None on the last page or if the job board isn't paginated
+def get_next_page_link(browser, pagination, page):
+    if pagination.get("Type") == "Next Button":
+        next_buttons = browser.find_elements_by_css_selector(pagination["Next"])
+        disabled = browser.find_elements_by_css_selector(pagination.get("Next Disabled", pagination["Next"]))
+        if len(next_buttons) == 0 or any("disabled" in (element.get_attribute("class") or "") for element in disabled):
+            return None
+        return next_buttons[0]
 
-    for link in links:
-        options = webdriver.ChromeOptions()
-        options.add_argument("--headless")
-        options.add_argument("window-size=2880,1800")
+    if pagination.get("Type") == "Numbered":
+        return next((link for link in browser.find_elements_by_css_selector(pagination["Page Links"]) if link.text.strip() == str(page + 1)), None)
 
-        browser = webdriver.Chrome(executable_path='./chromedriver', options=options)
-        browser.get(link)
+    return None
 
-        try:
-            WebDriverWait(browser, 20).until(EC.visibility_of_element_located((By.CSS_SELECTOR, "#siteBody > div > div > div > div:nth-child(1) > ul > li > ul > li:nth-child(1)")))
-
-            for city in browser.find_elements_by_css_selector("#siteBody > div > div > div > div > ul > li"):
-                for job in city.find_elements_by_css_selector("ul > li"):
-                    all_positions.append({
-                        "Company": "Rockstar Games",
-                        "Title": job.find_element_by_css_selector("a").text,
-                        "Link": job.find_element_by_css_selector("a").get_attribute("href"),
-                        "Location": city.find_element_by_css_selector("a.city > span").text
-                    })
-        except:
-            print("ERROR: Rockstar Games could not be scraped!")
 
-        if len(all_positions) > 0:
-            print("Done")
+# Reads the title, link and location of every job item on the current page
+# Boards that list their jobs under a heading per location set Job Group, the job items and the Job Group Location are then looked up inside each group
+# All job items are read in the browser with a single script, unless the board turns off Bulk Extraction
+# Boards with a Multi Location Button are read one by one too, the locations it reveals may only render after the click
+def scrape_job_items(browser, job_board):
+    if not job_board.get("Bulk Extraction", True) or "Multi Location Button" in job_board:
+        return scrape_job_items_one_by_one(browser, job_board)
 
-        browser.quit()
-        return all_positions
+    return [Position(
+        company=job_board["Company Name"],
+        title=title,
+        link=clean_job_item_link(link, job_board),
+        location=clean_job_item_location(location, job_board)
+    ) for title, link, location in browser.execute_script(JOB_ITEMS_SCRIPT, job_board)]
 
 
-# Scrapes all positions from Spotify's job board
-# Outputs each position with company name, position title, URL, and position location
-def scrape_spotify_positions(link):
-    print("\tScraping for Spotify...", end=" ", flush=True)
-    all_positions = []
+# Reads every job item with a WebDriver round trip per field, for boards where reading them in one script doesn't work
+def scrape_job_items_one_by_one(browser, job_board):
+    positions = []
 
-    options = webdriver.ChromeOptions()
-    options.add_argument("--headless")
-    options.add_argument("window-size=2880,1800")
+    groups = browser.find_elements_by_css_selector(job_board["Job Group"]) if "Job Group" in job_board else [browser]
+    for group in groups:
+        group_location = group.find_element_by_css_selector(job_board["Job Group Location"]).text if "Job Group Location" in job_board else None
 
-    browser = webdriver.Chrome(executable_path='./chromedriver', options=options)
-    browser.get(link)
+        for job in group.find_elements_by_css_selector(job_board["Job Item"]):
+            title = job.find_element_by_css_selector(job_board["Job Item Title"]).text
+            link = job.get_attribute("href") if "Job Item Link" not in job_board else job.find_element_by_css_selector(job_board["Job Item Link"]).get_attribute("href")
+            positions.append(Position(
+                company=job_board["Company Name"],
+                title=title,
+                link=clean_job_item_link(link, job_board),
+                location=clean_job_item_location(group_location if group_location is not None else get_job_item_location(job, job_board), job_board)
+            ))
 
-    try:
-        WebDriverWait(browser, 20).until(EC.visibility_of_element_located((By.CSS_SELECTOR, "table > tbody.js-jobs-results")))
+    return positions
 
-        while True:
-            try:
-                if "hidden" not in browser.find_element_by_css_selector("footer").get_attribute("class"):
-                    browser.execute_script("arguments[0].click();", browser.find_element_by_css_selector("footer a.btn.js-show-more-jobs"))
-                    time.sleep(0.5)
-                else:
-                    break
-            except:
-                break
 
-        for job in browser.find_elements_by_css_selector("table > tbody.js-jobs-results > tr"):
-            all_positions.append({
-                "Company": "Spotify",
-                "Title": job.find_element_by_css_selector("td.table-item-title > a > h4").text,
-                "Link": job.find_element_by_css_selector("td.table-item-title > a").get_attribute("href"),
-                "Location": job.find_element_by_css_selector("td:nth-child(3)").text
-            })
-    except:
-        print("ERROR: Spotify could not be scraped!")
+# Gets the location of a job item from its Job Item Location elements
+# Job items that collapse multiple locations behind a Multi Location Button have it clicked and every Multi Location Item joined instead
+def get_job_item_location(job, job_board):
+    if "Multi Location Button" in job_board:
+        buttons = job.find_elements_by_css_selector(job_board["Multi Location Button"])
+        if len(buttons) > 0:
+            buttons[0].click()
+            return "; ".join([location.text for location in job.find_elements_by_css_selector(job_board["Multi Location Item"])])
 
-    if len(all_positions) > 0:
-        print("Done")
+    if "Job Item Location" not in job_board:
+        return ""
 
-    browser.quit()
-    return all_positions
+    return ' '.join([location.text for location in job.find_elements_by_css_selector(job_board["Job Item Location"])])
 
 
-# Scrapes all positions from Ubisoft's job board
-# Outputs each position with company name, position title, URL, and position location
-def scrape_ubisoft_positions(link):
-    print("\tScraping for Ubisoft...", end=" ", flush=True)
-    all_positions = []
+# Strip Link Query drops tracking parameters that change between visits
+def clean_job_item_link(link, job_board):
+    return link.split("?")[0] if job_board.get("Strip Link Query", False) else link
 
-    options = webdriver.ChromeOptions()
-    options.add_argument("--headless")
-    options.add_argument("window-size=1440,718")
 
-    browser = webdriver.Chrome(executable_path='./chromedriver', options=options)
-    browser.get(link)
+# A Location Label shown in front of the location, like "Location:", is stripped off
+def clean_job_item_location(location, job_board):
+    if "Location Label" in job_board and location.startswith(job_board["Location Label"]):
+        location = location[len(job_board["Location Label"]):].lstrip(": \n")
+    return location
 
-    try:
-        WebDriverWait(browser, 20).until(EC.visibility_of_element_located((By.CSS_SELECTOR, "table > tbody")))
-
-        browser.execute_script("window.scrollTo(0, 175);")
-
-        # open 'Choose your area of expertise' dropdown
-        browser.find_element_by_css_selector("#sr-widget-search-filters-container > div:nth-child(3) > .k-widget.k-multiselect.k-header").click()
-        # select 'Game & Level Design/Creative Direction', 'Online/Web', and 'Programming'
-        for area_option in browser.find_elements_by_css_selector("#sr-widget-department-list > div > ul > li"):
-            if area_option.text == "Game & Level Design/Creative Direction" or area_option.text == "Online/Web" or area_option.text == "Programming":
-                area_option.click()
-
-        # open 'Select a type of contract' dropdown
-        browser.find_element_by_css_selector("#sr-widget-search-filters-container > div:nth-child(5) > .k-widget.k-multiselect.k-header").click()
-        # select 'Full-time'
-        for contract_type in browser.find_elements_by_css_selector("#sr-widget-employment-type-list > div > ul > li"):
-            if contract_type.get_attribute("textContent") == "Full-time":
-                browser.execute_script("arguments[0].click();", contract_type)
-
-        # open 'Explore opportunities by country' dropdown
-        browser.find_element_by_css_selector("#sr-widget-search-filters-container > div:nth-child(7) > .k-widget.k-multiselect.k-header").click()
-        # select 'United States'
-        for country in browser.find_elements_by_css_selector("#sr-widget-country-list > div > ul > li"):
-            if country.text == "United States":
-                country.click()
-
-        # click 'Search' button
-        browser.find_element_by_css_selector("#sr-widget-search").click()
-        time.sleep(0.1)
 
+# Data endpoints of custom job boards, found while scraping them in a browser and saved between runs
+# Boards are keyed by a hash of their whole entry in selenium_companies.json, so editing a board looks for its data source again
+# Every change is merged into the file straight away, so workers sharing the file don't overwrite each other's discoveries
+# and each process writes the file through its own temporary file, so two workers saving at once can't interleave their writes
+# Data sources are downloaded through a shared fetch engine, so they're paced, retried and circuit broken like every other request
+class DataSources:
+    def __init__(self, file_name=DATA_SOURCES_FILE):
+        self.file_name = file_name
+        self.lock = threading.Lock()
+        self.entries = self.load()
+        self.fetcher = ThreadedFetchEngine()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.fetcher.close()
+
+    def load(self):
         try:
-            WebDriverWait(browser, 20).until(EC.visibility_of_element_located((By.CSS_SELECTOR, "table > tbody")))
-
-            has_more_pages = True
-            while has_more_pages:
-                for job in browser.find_elements_by_css_selector("table > tbody > tr"):
-                    all_positions.append({
-                        "Company": "Ubisoft",
-                        "Title": job.find_element_by_css_selector("td:nth-child(1) > a").text,
-                        "Link": job.find_element_by_css_selector("td:nth-child(1) > a").get_attribute("href"),
-                        "Location": job.find_element_by_css_selector("td:nth-child(3) > a").text
-                    })
-
-                for nav_button in browser.find_elements_by_css_selector("#sr-widget-job-grid > div.k-pager-wrap > a"):
-                    if nav_button.get_attribute("title") == "Go to the next page":
-                        if "disabled" in nav_button.get_attribute("class"):
-                            has_more_pages = False
-                        else:
-                            nav_button.click()
-        except:
-            print("ERROR: Ubisoft could not be scraped!")
+            with open(self.file_name) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    @staticmethod
+    def get_key(job_board):
+        return hashlib.sha1(json.dumps(job_board, sort_keys=True).encode()).hexdigest()
+
+    def get(self, job_board):
+        with self.lock:
+            return self.entries.get(self.get_key(job_board))
+
+    # Saves the board's data source, or None to remember that it has none until DATA_SOURCE_RECHECK_TIME has passed
+    def put(self, job_board, source):
+        self.update(self.get_key(job_board), {"Company Name": job_board["Company Name"], "Checked": time.time(), "Data Source": source})
+
+    def remove(self, job_board):
+        self.update(self.get_key(job_board), None)
+
+    def update(self, key, entry):
+        with self.lock:
+            self.entries = self.load()
+            if entry is None:
+                self.entries.pop(key, None)
+            else:
+                self.entries[key] = entry
 
-    except:
-        print("ERROR: Ubisoft could not be scraped!")
+            temporary_file = self.file_name + "." + str(os.getpid()) + ".tmp"
+            with open(temporary_file, "w") as f:
+                json.dump(self.entries, f, indent=2)
+            os.replace(temporary_file, self.file_name)
+
+
+# Opens the data sources of custom job boards, or gives None if data sources aren't used
+@contextmanager
+def open_data_sources(use_data_sources=True):
+    if not use_data_sources:
+        yield None
+        return
 
-    if len(all_positions) > 0:
-        print("Done")
+    with DataSources() as data_sources:
+        yield data_sources
 
-    browser.quit()
+
+# Scrapes a custom job board from the data source found on an earlier run, without a browser
+# Returns None if the board has no data source, or if it stopped working and the board has to be scraped in a browser again
+def get_positions_from_data_source(data_sources, job_board):
+    entry = data_sources.get(job_board)
+    if entry is None or entry["Data Source"] is None:
+        return None
+
+    source = entry["Data Source"]
+    try:
+        rows = get_json_path(get_data_document(data_sources.fetcher, source["URL"], source.get("Embedded")), source["Path"])
+        all_positions = [Position(
+            company=job_board["Company Name"],
+            title=row[source["Title"]],
+            link=source["Link Template"].format(row[source["Link"]]),
+            location=row[source["Location"]] if source["Location"] is not None else ""
+        ) for row in map(flatten_json, rows)]
+    except (requests.exceptions.RequestException, ValueError, LookupError, TypeError, AttributeError):
+        all_positions = []
+
+    if len(all_positions) == 0:
+        print("\t" + job_board["Company Name"] + "'s data source stopped working, scraping it in a browser instead")
+        data_sources.remove(job_board)
+        return None
+
+    print("\tScraping for " + job_board["Company Name"] + " from its data source... Done")
     return all_positions
 
 
-# Scrapes all positions from Zendesk's job board
-# Outputs each position with company name, position title, URL, and position location
-def scrape_zendesk_positions(link):
-    print("\tScraping for Zendesk...", end=" ", flush=True)
-    all_positions = []
+# Looks through the data the board's page loaded, and the data embedded in its HTML, for one document that holds exactly the positions scraped in the browser
+# Saves where the positions are in that document, so later runs can skip the browser, or that there is none
+def discover_data_source(data_sources, browser, job_board, positions):
+    entry = data_sources.get(job_board)
+    if len(positions) == 0 or (entry is not None and time.time() - entry["Checked"] < DATA_SOURCE_RECHECK_TIME):
+        return
 
-    options = webdriver.ChromeOptions()
-    options.add_argument("--headless")
-    options.add_argument("window-size=2880,1800")
+    candidates = [(job_board["Careers Website"], selector) for selector in EMBEDDED_DATA_SELECTORS]
+    candidates += [(link, None) for link in dict.fromkeys(browser.execute_script(DATA_REQUESTS_SCRIPT))][:MAX_DATA_REQUESTS]
 
-    browser = webdriver.Chrome(executable_path='./chromedriver', options=options)
-    browser.get(link)
+    for link, embedded in candidates:
+        try:
+            document = get_data_document(data_sources.fetcher, link, embedded)
+        except (requests.exceptions.RequestException, ValueError):
+            continue
 
-    try:
-        WebDriverWait(browser, 20).until(EC.visibility_of_element_located((By.CSS_SELECTOR, ".phs-facet-results-block > .phs-jobs-list")))
+        source = find_positions_in_json(document, positions)
+        if source is not None:
+            print("\tFound a data source for " + job_board["Company Name"] + ", later runs will scrape it without a browser")
+            data_sources.put(job_board, dict(source, **{"URL": link, "Embedded": embedded}))
+            return
+
+    data_sources.put(job_board, None)
 
-        # Select Job Category: Engineering & Product
-        browser.find_element_by_css_selector(".phs-filter-panels .panel:nth-child(1)").click()
-        browser.find_elements_by_css_selector(".phs-filter-panels .panel:nth-child(1) .phs-facet-results > ul > li")[0].click()
 
+# Downloads a JSON document, or the JSON embedded in the script tags matching the selector of an HTML page as a list with one item per tag
+# The page is only fetched on the fetch engine's thread and is parsed on the calling thread
+def get_data_document(fetcher, link, embedded=None):
+    page = fetcher.get(link)
+    page.raise_for_status()
+
+    if embedded is None:
+        return page.json()
+
+    documents = []
+    for script in BeautifulSoup(page.text, "html.parser").select(embedded):
         try:
-            WebDriverWait(browser, 20).until(EC.visibility_of_element_located((By.CSS_SELECTOR, ".phs-facet-results-block > .phs-jobs-list")))
+            documents.append(json.loads(script.string or ""))
+        except ValueError:
+            pass
+    return documents
+
+
+# Follows a path of keys and list indexes into a JSON document
+def get_json_path(document, path):
+    for key in path:
+        document = document[key]
+    return document
+
+
+# Lists every list of objects in a JSON document along with its path
+def find_json_lists(document, path=()):
+    if isinstance(document, list):
+        if len(document) > 0 and all(isinstance(item, dict) for item in document):
+            yield list(path), document
+        items = enumerate(document)
+    elif isinstance(document, dict):
+        items = document.items()
+    else:
+        return
+
+    for key, value in items:
+        yield from find_json_lists(value, path + (key,))
+
+
+# Flattens the nested objects of a JSON object into one object of strings with dotted keys, e.g. {"location": {"name": ...}} into {"location.name": ...}
+# Whitespace is collapsed the way the browser shows text
+def flatten_json(document, prefix=""):
+    flattened = {}
+    for key, value in document.items():
+        if isinstance(value, dict):
+            flattened.update(flatten_json(value, prefix + str(key) + "."))
+        elif isinstance(value, (str, int)) and not isinstance(value, bool):
+            flattened[prefix + str(key)] = " ".join(str(value).split())
+    return flattened
+
+
+# Finds the list of objects in a JSON document whose links are exactly the links of the scraped positions, with the fields holding their titles and locations
+# Links can be built from a field with a template, e.g. "https://example.com/jobs/{}" for a field holding only the job's ID
+# Returns the path to the list and its fields, or None if no list matches
+def find_positions_in_json(document, positions):
+    positions_by_link = {position["Link"]: position for position in positions}
+
+    for path, rows in find_json_lists(document):
+        rows = [flatten_json(row) for row in rows]
+        link_field = find_link_field(rows, positions_by_link)
+        if link_field is None:
+            continue
+
+        link, link_template = link_field
+        matched = [(row, positions_by_link[link_template.format(row[link])]) for row in rows]
+        title = find_matching_field(matched, "Title")
+        location = find_matching_field(matched, "Location")
+        if title is not None and (location is not None or all(position["Location"] == "" for _, position in matched)):
+            return {"Path": path, "Link": link, "Link Template": link_template, "Title": title, "Location": location}
 
-            time.sleep(1)
+    return None
 
-            # Select Country: United States Of America
-            browser.find_element_by_css_selector(".phs-filter-panels .panel:nth-child(2)").click()
-            browser.find_elements_by_css_selector(".phs-filter-panels .panel:nth-child(2) .phs-facet-results > ul > li")[0].click()
 
-            try:
-                WebDriverWait(browser, 20).until(EC.visibility_of_element_located((By.CSS_SELECTOR, ".phs-facet-results-block > .phs-jobs-list")))
-
-                time.sleep(1)
-
-                page_count = int(browser.find_element_by_css_selector(".phs-jobs-list-header .phs-header-controls .result-count").text)
-                page_count = ((page_count // 10) + 1) if (page_count % 10 > 0) else (page_count // 10)
-
-                for page in range(1, page_count + 1):
-                    for job in browser.find_elements_by_css_selector("ul > li.jobs-list-item"):
-                        # if multiple locations, open dropdown to get all locations. otherwise, scrape the single location
-                        try:
-                            job.find_element_by_css_selector(".job-multi-locations > li > button").click()
-                            all_positions.append({
-                                "Company": "Zendesk",
-                                "Title": job.find_element_by_css_selector(".job-title > span").text,
-                                "Link": job.find_element_by_css_selector(".information > span > a").get_attribute("href"),
-                                "Location": "; ".join([location.text for location in job.find_elements_by_css_selector(".job-multi-locations > li > ul > li.location")])
-                            })
-                        except:
-                            all_positions.append({
-                                "Company": "Zendesk",
-                                "Title": job.find_element_by_css_selector(".job-title > span").text,
-                                "Link": job.find_element_by_css_selector(".information > span > a").get_attribute("href"),
-                                "Location": job.find_element_by_css_selector(".job-info .job-location").text[9:]
-                            })
-
-                    # move to next page
-                    if (page + 1) <= page_count:
-                        for i in browser.find_elements_by_css_selector("ul.pagination > li"):
-                            if i.find_element_by_css_selector("a").text == str(page + 1):
-                                i.find_element_by_css_selector("a").click()
-                                break
-
-                    time.sleep(1)
-            except:
-                print("ERROR: Zendesk could not be scraped! (after selecting Country)")
-        except:
-            print("ERROR: Zendesk could not be scraped! (after selecting Job Category)")
-    except:
-        print("ERROR: Zendesk could not be scraped!")
+# Finds the field, and the template around it, that gives exactly the scraped links when filled in for every row
+def find_link_field(rows, positions_by_link):
+    if len(rows) != len(positions_by_link):
+        return None
 
-    if len(all_positions) > 0:
-        print("Done")
+    for field, value in rows[0].items():
+        for link in positions_by_link:
+            if len(value) == 0 or value not in link:
+                continue
 
-    browser.quit()
-    return all_positions
+            before, after = link.split(value, 1)
+            link_template = before.replace("{", "{{").replace("}", "}}") + "{}" + after.replace("{", "{{").replace("}", "}}")
+            if all(field in row for row in rows) and {link_template.format(row[field]) for row in rows} == set(positions_by_link):
+                return field, link_template
+
+    return None
+
+
+# Finds the field that holds the same text as a position field in every row
+def find_matching_field(matched, position_field):
+    expected = [" ".join(position[position_field].split()) for _, position in matched]
+    for field, value in matched[0][0].items():
+        if value == expected[0] and all(row.get(field) == text for (row, _), text in zip(matched, expected)):
+            return field
+    return None
 
 
 # Strips string of all punctuation so only alphanumeric characters remain
@@ -635,122 +1826,1869 @@ def remove_punctuation(str):
     return no_punct
 
 
-# Filters out any positions that have a position title found in the blacklist
-def filter_by_position_title(positions, blacklisted_position_titles):
-    filtered_list = []
+# Prefix trie over lowercased position titles
+# Finds whether a title starts with any of the phrases in the trie in a single walk over the title
+class PrefixTrie:
+    END = None
+
+    def __init__(self, prefixes):
+        self.root = {}
+
+        for prefix in prefixes:
+            node = self.root
+            for char in prefix.lower():
+                node = node.setdefault(char, {})
+            node[PrefixTrie.END] = True
+
+    def matches_start_of(self, text):
+        node = self.root
+
+        for char in text:
+            if PrefixTrie.END in node:
+                return True
+            node = node.get(char)
+            if node is None:
+                return False
+
+        return PrefixTrie.END in node
+
+
+# Aho-Corasick automaton over lowercased keywords
+# Finds whether any keyword appears anywhere inside a text in a single pass over the text, no matter how many keywords there are
+class KeywordAutomaton:
+    def __init__(self, keywords):
+        self.transitions = [{}]
+        self.fallbacks = [0]
+        self.is_match = [False]
+
+        for keyword in keywords:
+            state = 0
+            for char in keyword.lower():
+                if char not in self.transitions[state]:
+                    self.transitions.append({})
+                    self.fallbacks.append(0)
+                    self.is_match.append(False)
+                    self.transitions[state][char] = len(self.transitions) - 1
+                state = self.transitions[state][char]
+            self.is_match[state] = True
+
+        # link each state to the longest proper suffix that is also a state, breadth first so shorter states are linked first
+        queue = deque(self.transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.transitions[state].items():
+                queue.append(next_state)
+
+                fallback = self.fallbacks[state]
+                while fallback != 0 and char not in self.transitions[fallback]:
+                    fallback = self.fallbacks[fallback]
+                if state != 0 and char in self.transitions[fallback]:
+                    self.fallbacks[next_state] = self.transitions[fallback][char]
+                self.is_match[next_state] = self.is_match[next_state] or self.is_match[self.fallbacks[next_state]]
+
+    def matches_any(self, text):
+        if self.is_match[0]:
+            return True
+
+        state = 0
+        for char in text:
+            while state != 0 and char not in self.transitions[state]:
+                state = self.fallbacks[state]
+            state = self.transitions[state].get(char, 0)
+            if self.is_match[state]:
+                return True
+
+        return False
+
+
+# Separators between the locations of a position that lists more than one, like "Seattle, WA; Austin, TX" or "London or Berlin"
+LOCATION_SEPARATORS = re.compile(r"\s*(?:;|\||/|—|–|&|\s-?or-?\s)\s*", re.IGNORECASE)
+# Separators between the city, state and country of a single location
+LOCATION_PART_SEPARATORS = re.compile(r"\s*(?:,|\s-\s)\s*")
+# Notes that don't change where a position is, like "(HQ)" or Workday's "+ 2 more"
+LOCATION_NOTES = re.compile(r"\([^)]*\)|\+\s*\d+\s*more", re.IGNORECASE)
+LOCATION_NOISE_WORDS = {"greater", "area", "office", "hq", "headquarters", "metro", "metropolitan", "campus"}
+# First parts of a location that describe how the position is worked rather than where, so "Remote, France" isn't decided by "Remote"
+LOCATION_QUALIFIERS = {"remote"}
+# Locations in this country leave it out as often as not, so it is always left out
+DEFAULT_COUNTRY = "united states"
+
+
+def load_location_aliases(file_name=LOCATION_ALIASES_FILE):
+    try:
+        with open(file_name) as f:
+            return {alias.lower(): name.lower() for alias, name in json.load(f).items()}
+    except FileNotFoundError:
+        return {}
+
+
+# Index of the whitelisted and blacklisted locations by their normalized city, state and country
+# Listed locations are still matched exactly first, so everything in the lists is decided the same way it always has been
+# Any other location is split into each location it lists, each of which is normalized and decided by the most specific listed location it falls under
+class LocationIndex:
+    def __init__(self, whitelisted_locations=(), blacklisted_locations=(), aliases=None):
+        self.aliases = aliases or {}
+        self.exact = {}
+        self.normalized = {}
+        self.checked = {}
+
+        for location in whitelisted_locations:
+            self.add(location, True)
+        for location in blacklisted_locations:
+            self.add(location, False)
+
+    # Lists a location as kept or not, a location that is in both lists is blacklisted
+    def add(self, location, keeps):
+        if location.strip() == "":
+            return
+
+        self.exact[location.lower()] = keeps and self.exact.get(location.lower(), True)
+        locations = self.split(location)
+        if len(locations) == 1 and len(self.normalize(locations[0])) > 0:
+            key = self.normalize(locations[0])
+            self.normalized[key] = keeps and self.normalized.get(key, True)
+        self.checked = {}
+
+    def split(self, location):
+        return [location for location in LOCATION_SEPARATORS.split(LOCATION_NOTES.sub("", location)) if location.strip() != ""]
+
+    # Turns a single location into a tuple of its canonical parts, from most to least specific
+    def normalize(self, location):
+        parts = []
+
+        for part in LOCATION_PART_SEPARATORS.split(location.lower()):
+            words = re.sub(r"[^\w\s]", " ", re.sub(r"[.'’]", "", part)).split()
+            part = " ".join(word for word in words if word not in LOCATION_NOISE_WORDS)
+            part = self.aliases.get(part, part)
+            if part != "" and (len(parts) == 0 or parts[-1] != part):
+                parts.append(part)
+
+        if len(parts) > 1 and parts[-1] == DEFAULT_COUNTRY:
+            parts.pop()
+        return tuple(parts)
+
+    # Lists the normalized locations a normalized location falls under, from most to least specific
+    # The whole location, then its city and state, then its state and country, then its city, then its state or country alone
+    def get_covering_keys(self, key):
+        candidates = [key[:end] for end in range(len(key), 1, -1)] + [key[start:] for start in range(1, len(key) - 1)]
+        if len(key) == 1 or key[0] not in LOCATION_QUALIFIERS:
+            candidates.append(key[:1])
+        if len(key) > 1:
+            candidates.append(key[-1:])
+        return candidates
+
+    # Decides a normalized location by the most specific listed location it falls under, or None if it doesn't fall under any
+    def decide(self, key):
+        for candidate in self.get_covering_keys(key):
+            if candidate in self.normalized:
+                return self.normalized[candidate]
+        return None
+
+    # Decides whether to keep a position in the location, and lists which of its locations are in neither list
+    # A position that lists more than one location is only dropped if every one of them is blacklisted
+    def check(self, location):
+        if location in self.checked:
+            return self.checked[location]
+
+        if location.lower() in self.exact:
+            result = (self.exact[location.lower()], ())
+        else:
+            decisions = []
+            unsure = []
+            for single_location in self.split(location):
+                key = self.normalize(single_location)
+                decision = self.decide(key) if len(key) > 0 else True
+                if decision is None:
+                    unsure.append(single_location.strip())
+                decisions.append(decision)
+            result = (any(decision is not False for decision in decisions) or len(decisions) == 0, tuple(unsure))
+
+        self.checked[location] = result
+        return result
+
+
+# Drops every listed location that the rest of the lists already decide the same way once locations are normalized
+# Returns the whitelisted and blacklisted locations that are left, in their original order
+def compact_location_rules(whitelisted_locations, blacklisted_locations, aliases=None):
+    index = LocationIndex(aliases=aliases)
+    rules = [(location, True) for location in whitelisted_locations] + [(location, False) for location in blacklisted_locations]
+    kept = set()
+
+    # Locations with fewer parts go in first, so a more specific location is only kept if it's decided differently
+    for location, keeps in sorted(rules, key=lambda rule: (len(index.split(rule[0])) != 1, len(index.normalize(rule[0])))):
+        if location.strip() != "" and index.check(location) != (keeps, ()):
+            index.add(location, keeps)
+            kept.add((location, keeps))
+
+    return [location for location in whitelisted_locations if (location, True) in kept], [location for location in blacklisted_locations if (location, False) in kept]
+
+
+# Compiles every rule file once into hashed sets, a prefix trie and keyword automatons
+# Each position is then checked against all of the rules in one pass, in the same order the filters are applied in
+class PositionFilter:
+    def __init__(self, blacklisted_position_titles=(), required_keywords=(), blacklisted_keywords=(),
+                 whitelisted_locations=(), blacklisted_locations=(), already_seen_links=(), location_aliases=None):
+        self.blacklisted_titles = PrefixTrie(blacklisted_position_titles)
+        self.has_required_keywords = len(required_keywords) > 0
+        self.required_keywords = KeywordAutomaton(required_keywords)
+        self.blacklisted_keywords = KeywordAutomaton(blacklisted_keywords)
+        self.locations = LocationIndex(whitelisted_locations, blacklisted_locations, location_aliases)
+        self.already_seen_links = set(link.lower() for link in already_seen_links)
+        self.unsure_locations = set()
+
+        # Each filter stage in the order it's applied, already seen links are usually filtered out by the position store instead
+        self.stages = [("Title Keywords", self.keeps_title_keywords), ("Title", self.keeps_title), ("Location", self.keeps_location)]
+        if len(self.already_seen_links) > 0:
+            self.stages.append(("Already Seen", self.keeps_unseen))
+
+    # If required keywords list isn't empty, only keep positions that contain any required keyword
+    # Otherwise, filters out any positions with blacklisted keywords found in the title
+    def keeps_title_keywords(self, position):
+        if self.has_required_keywords:
+            return self.required_keywords.matches_any(position.lower_title)
+        return not self.blacklisted_keywords.matches_any(position.lower_title)
+
+    # Filters out any positions whose title is or starts with a blacklisted position title
+    def keeps_title(self, position):
+        return not self.blacklisted_titles.matches_start_of(position.lower_title)
+
+    # Filters out any positions that are only in blacklisted locations
+    # Remembers locations that are in neither the whitelist or the blacklist
+    def keeps_location(self, position):
+        keeps, unsure_locations = self.locations.check(position.location)
+        self.unsure_locations.update(unsure_locations)
+        return keeps
+
+    # Filters out any positions that have already been reviewed
+    def keeps_unseen(self, position):
+        return position.link.lower() not in self.already_seen_links
+
+    def keeps(self, position):
+        return all(keeps(position) for _, keeps in self.stages)
+
+    # Keeps the positions that pass every filter stage and counts how many each stage dropped in the run metrics
+    def filter(self, positions):
+        filtered_list = []
+        dropped = [0] * len(self.stages)
+
+        for position in positions:
+            for stage, (_, keeps) in enumerate(self.stages):
+                if not keeps(position):
+                    dropped[stage] += 1
+                    break
+            else:
+                filtered_list.append(position)
 
-    for position in positions:
-        if (position["Title"].lower() not in [title.lower() for title in blacklisted_position_titles] and
-            True not in [position["Title"].lower().startswith(title.lower()) for title in blacklisted_position_titles]):
-            filtered_list.append(position)
+        positions_in = len(filtered_list) + sum(dropped)
+        for stage, (name, _) in enumerate(self.stages):
+            run_metrics.add_filter(name, positions_in, dropped[stage])
+            positions_in -= dropped[stage]
 
-    return filtered_list
+        return filtered_list
 
 
-# Filters out any positions with blacklisted keywords found in the title
-# If required keywords list isn't empty, only keep positions that contain any required keyword
-def filter_by_position_title_keywords(positions, required_keywords, blacklisted_keywords):
-    filtered_list = []
+# Prints every location that is in neither the whitelist or the blacklist
+def print_unsure_locations(unsure_locations):
+    if len(unsure_locations) > 0:
+        print("Add each location to the whitelist or blacklist:")
+        for location in unsure_locations:
+            print("\t" + location)
 
-    for position in positions:
-        if len(required_keywords) > 0:
-            if True in [(True if (keyword.lower() in position["Title"].lower()) else False) for keyword in required_keywords]:
-                filtered_list.append(position)
-        elif True not in [(True if (keyword.lower() in position["Title"].lower()) else False) for keyword in blacklisted_keywords]:
-            filtered_list.append(position)
 
-    return filtered_list
+# Filters out any positions that have a position title found in the blacklist
+def filter_by_position_title(positions, blacklisted_position_titles):
+    position_filter = PositionFilter(blacklisted_position_titles=blacklisted_position_titles)
+    return [position for position in positions if position_filter.keeps_title(position)]
 
 
-# Filters out any positions that are in a location found in the blacklist
-# Does not account for when position's location is a list of multiple locations
-def filter_by_location(positions, whitelisted_locations, blacklisted_locations):
-    filtered_list = []
-    unsure_locations = []
+# Filters out any positions with blacklisted keywords found in the title
+# If required keywords list isn't empty, only keep positions that contain any required keyword
+def filter_by_position_title_keywords(positions, required_keywords, blacklisted_keywords):
+    position_filter = PositionFilter(required_keywords=required_keywords, blacklisted_keywords=blacklisted_keywords)
+    return [position for position in positions if position_filter.keeps_title_keywords(position)]
 
-    for position in positions:
-        if position["Location"] == "" or position["Location"].lower() not in [location.lower() for location in blacklisted_locations]:
-            filtered_list.append(position)
-        if (position["Location"].lower() not in [location.lower() for location in whitelisted_locations] and
-            position["Location"].lower() not in [location.lower() for location in blacklisted_locations] and
-            position["Location"] != ""):
-            unsure_locations.append(position["Location"])
 
-    if len(unsure_locations) > 0:
-        print("Add each location to the whitelist or blacklist:")
-        for location in list(set(unsure_locations)):
-            print("\t" + location)
+# Filters out any positions that are in a location found in the blacklist
+# If a position lists multiple locations, it's only filtered out if all of them are in the blacklist
+def filter_by_location(positions, whitelisted_locations, blacklisted_locations, location_aliases=None):
+    position_filter = PositionFilter(whitelisted_locations=whitelisted_locations, blacklisted_locations=blacklisted_locations, location_aliases=location_aliases)
+    filtered_list = [position for position in positions if position_filter.keeps_location(position)]
 
+    print_unsure_locations(position_filter.unsure_locations)
     return filtered_list
 
 
 # Filters out any positions that have already been reviewed
 def filter_by_already_seen(positions, already_seen_links):
-    filtered_list = []
-
-    for position in positions:
-        if position["Link"].lower() not in [link.lower() for link in already_seen_links]:
-            filtered_list.append(position)
-
-    return filtered_list
+    position_filter = PositionFilter(already_seen_links=already_seen_links)
+    return [position for position in positions if position_filter.keeps_unseen(position)]
 
 
 # Export positions into CSV
-def export_to_csv(positions):
-    f = open("scraped_positions.csv", "w")
+def export_to_csv(positions, file_name=SCRAPED_POSITIONS_FILE):
+    f = open(file_name, "w")
     writer = csv.DictWriter(
-        f, fieldnames=["Company", "Title", "Link", "Location"])
+        f, fieldnames=CSV_FIELDS)
     writer.writeheader()
     writer.writerows(positions)
     f.close()
 
 
-def scrape(all_companies, blacklisted_position_titles, required_keywords, blacklisted_keywords, whitelisted_locations, blacklisted_locations, already_seen_links):
-    print("Getting all positions on Greenhouse job boards")
-    filtered_positions = get_positions_on_greenhouse(all_companies["greenhouse"])
+# Writes each position into the CSV as soon as it comes out of the pipeline
+def stream_to_csv(positions, file_name=SCRAPED_POSITIONS_FILE, fields=CSV_FIELDS):
+    with open(file_name, "w", buffering=1) as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for position in positions:
+            writer.writerow(position)
 
-    print("Getting all positions on Lever job boards")
-    filtered_positions += get_positions_on_lever(all_companies["lever"])
 
-    print("Getting all positions on Workday job boards")
-    filtered_positions += get_positions_on_workday(all_companies["workday"])
+# Generator stage that only passes on the positions that the check keeps
+# Counts how many positions the stage dropped in the run metrics once the stream ends
+def filter_stage(positions, keeps, name):
+    positions_in = 0
+    positions_kept = 0
 
-    print("Getting all positions on custom job boards")
-    filtered_positions += get_positions_using_selenium(all_companies["selenium"])
-    filtered_positions += scrape_apple_positions("https://jobs.apple.com/en-us/search?sort=relevance&key=frontend+software%252520engineer&location=united-states-USA&team=apps-and-frameworks-SFTWR-AF")
-    filtered_positions += scrape_coda_positions("https://www.linkedin.com/jobs/search/?currentJobId=1343955007&f_C=18274722&locationId=OTHERS.worldwide")
-    filtered_positions += scrape_ea_positions("https://ea.gr8people.com/index.gp?method=cappportal.showPortalSearch&sysLayoutId=123&page=1&inp10438=2&inp888=233&inp1810=7&inp1810=4&inp1377=6")
-    filtered_positions += scrape_hulu_positions("https://www.hulu.com/jobs/positions")
-    filtered_positions += scrape_linkedin_positions("https://www.linkedin.com/jobs/search/?f_C=1337&locationId=OTHERS.worldwide")
-    filtered_positions += scrape_rockstar_positions([
-        "https://www.rockstargames.com/careers/openings/department/game-code",
-        "https://www.rockstargames.com/careers/openings/department/game-design-scripting",
-        "https://www.rockstargames.com/careers/openings/department/online-game-services"
-    ])
-    filtered_positions += scrape_spotify_positions("https://www.spotifyjobs.com/search-jobs/#category=students%2Csoftware-engineering&location=usa")
-    filtered_positions += scrape_ubisoft_positions("https://www.ubisoft.com/en-US/careers/search.aspx")
-    filtered_positions += scrape_zendesk_positions("https://jobs.zendesk.com/us/en/search-results")
-
-    print("Filtering all positions by position title keywords")
-    filtered_positions = filter_by_position_title_keywords(filtered_positions, required_keywords, blacklisted_keywords)
-    print("Filtering all positions by position title")
-    filtered_positions = filter_by_position_title(filtered_positions, blacklisted_position_titles)
-    print("Filtering all positions by location")
-    filtered_positions = filter_by_location(filtered_positions, whitelisted_locations, blacklisted_locations)
-    print("Filtering all positions by unseen links")
-    filtered_positions = filter_by_already_seen(filtered_positions, already_seen_links)
-
-    # Sort positions alphabetically by company name
-    print("Sorting all positions alphabetically by company name")
-    filtered_positions = sorted(filtered_positions, key=lambda k: k['Company'])
-
-    print("Exporting all positions to CSV file")
-    export_to_csv(filtered_positions)
+    try:
+        for position in positions:
+            positions_in += 1
+            if keeps(position):
+                positions_kept += 1
+                yield position
+    finally:
+        run_metrics.add_filter(name, positions_in, positions_in - positions_kept)
+
+
+# Sorts a CSV file of positions alphabetically by company name without loading the whole file into memory
+# Sorts the file in chunks into temporary files, then merges the chunks back into the original file
+def external_sort_csv(file_name=SCRAPED_POSITIONS_FILE, chunk_size=SORT_CHUNK_SIZE):
+    chunk_files = []
+
+    with open(file_name) as f:
+        reader = csv.DictReader(f)
+        while True:
+            chunk = [row for _, row in zip(range(chunk_size), reader)]
+            if len(chunk) == 0:
+                break
+
+            chunk_file = tempfile.TemporaryFile("w+")
+            writer = csv.DictWriter(chunk_file, fieldnames=CSV_FIELDS)
+            writer.writerows(sorted(chunk, key=lambda k: k['Company']))
+            chunk_file.seek(0)
+            chunk_files.append(chunk_file)
+
+    try:
+        stream_to_csv(heapq.merge(*[csv.DictReader(chunk_file, fieldnames=CSV_FIELDS) for chunk_file in chunk_files], key=lambda k: k['Company']), file_name)
+    finally:
+        for chunk_file in chunk_files:
+            chunk_file.close()
+
+
+# Writes batches of positions into one newline delimited JSON file, compressed or not depending on the function that opens it
+class NdjsonFileWriter:
+    def __init__(self, file_name, run, opener=open):
+        self.file = opener(file_name, "wt", encoding="utf-8")
+        self.run = run
+
+    def write_batch(self, positions):
+        self.file.write("".join(json.dumps(dict(position.to_dict(), Scraped=self.run), ensure_ascii=False) + "\n" for position in positions))
+
+    def close(self):
+        self.file.close()
+
+
+# Writes batches of positions into one Parquet file, each batch as a row group of string columns
+class ParquetFileWriter:
+    def __init__(self, file_name, run):
+        self.schema = pyarrow.schema([(field, pyarrow.string()) for field in EXPORT_FIELDS])
+        self.writer = pyarrow.parquet.ParquetWriter(file_name, self.schema)
+        self.run = run
+
+    def write_batch(self, positions):
+        columns = [list(column) for column in zip(*[position.to_record() for position in positions])] + [[self.run] * len(positions)]
+        self.writer.write_table(pyarrow.Table.from_arrays(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+# Every export format by name, as (file extension, writer, module the writer needs that might not be installed)
+# A new format only needs a writer with write_batch and close and an entry here
+EXPORT_FORMATS = {
+    "parquet": (".parquet", ParquetFileWriter, "pyarrow"),
+    "ndjson": (".ndjson", NdjsonFileWriter, None),
+    "ndjson.gz": (".ndjson.gz", partial(NdjsonFileWriter, opener=partial(gzip.open, compresslevel=6)), None),
+    "ndjson.zst": (".ndjson.zst", partial(NdjsonFileWriter, opener=zstandard.open if zstandard is not None else None), "zstandard"),
+}
+EXPORT_MODULES = {"pyarrow": pyarrow, "zstandard": zstandard}
+# Exports can be split into a directory per company or per date of the run, named the way Hive, Arrow and Spark read partitions
+EXPORT_PARTITIONS = {
+    "company": lambda position, run: "company=" + quote(position.company or "", safe=" "),
+    "date": lambda position, run: "date=" + run[:10],
+}
+
+
+# Export of the positions of a run into a dataset directory in one format, optionally split into partitions
+# Positions are written in batches as they come, so an export never holds more than a batch of each partition in memory
+# Each run writes its own part files named after the run. If append, the part files of earlier runs are kept, otherwise the dataset is replaced
+# Part files are written into a temporary directory next to the dataset and only moved into it once the run's export is closed,
+# so a run that dies or is interrupted leaves the previous exports as they were
+class PositionExport:
+    def __init__(self, export_format, run, partition_by=None, append=False, directory=EXPORTS_DIRECTORY, batch_size=EXPORT_BATCH_SIZE):
+        self.extension, self.writer_class, _ = EXPORT_FORMATS[export_format]
+        self.directory = os.path.join(directory, os.path.splitext(SCRAPED_POSITIONS_FILE)[0] + self.extension)
+        self.temporary_directory = os.path.join(directory, "." + os.path.basename(self.directory) + ".tmp")
+        self.append = append
+        self.run = run
+        self.part_name = "part-" + re.sub(r"[^0-9A-Za-z]", "", run)
+        self.partition = EXPORT_PARTITIONS[partition_by] if partition_by is not None else None
+        self.batch_size = batch_size
+        self.batches = {}
+        self.writers = {}
+        self.parts = {}
+
+        shutil.rmtree(self.temporary_directory, ignore_errors=True)
+
+    def write(self, position):
+        partition = self.partition(position, self.run) if self.partition is not None else ""
+        batch = self.batches.setdefault(partition, [])
+        batch.append(position)
+        if len(batch) >= self.batch_size:
+            self.flush(partition)
+
+    # Writes the partition's batch to its file, opening a new part file if it has none open
+    # Open files are kept in the order they were last written to, so the one written to longest ago is closed first
+    def flush(self, partition):
+        positions = self.batches.pop(partition, [])
+        if len(positions) == 0:
+            return
+
+        writer = self.writers.pop(partition, None)
+        if writer is None:
+            if len(self.writers) >= MAX_OPEN_EXPORT_FILES:
+                self.writers.pop(next(iter(self.writers))).close()
+
+            part = self.parts.get(partition, 0)
+            self.parts[partition] = part + 1
+            os.makedirs(os.path.join(self.temporary_directory, partition), exist_ok=True)
+            writer = self.writer_class(os.path.join(self.temporary_directory, partition, self.part_name + ("-" + str(part) if part > 0 else "") + self.extension), self.run)
+
+        self.writers[partition] = writer
+        writer.write_batch(positions)
+
+    # Writes out the last batches and moves the run's part files into the dataset, an export that wrote nothing leaves the dataset as it was
+    def close(self):
+        for partition in list(self.batches):
+            self.flush(partition)
+        self.close_writers()
+        if not os.path.isdir(self.temporary_directory):
+            return
+
+        if not self.append:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            os.replace(self.temporary_directory, self.directory)
+            return
+
+        for partition_directory, _, file_names in os.walk(self.temporary_directory):
+            target_directory = os.path.join(self.directory, os.path.relpath(partition_directory, self.temporary_directory))
+            os.makedirs(target_directory, exist_ok=True)
+            for file_name in file_names:
+                os.replace(os.path.join(partition_directory, file_name), os.path.join(target_directory, file_name))
+        shutil.rmtree(self.temporary_directory)
+
+    # Throws away the run's part files, for when the run fails before its export is finished
+    def discard(self):
+        self.batches = {}
+        self.close_writers()
+        shutil.rmtree(self.temporary_directory, ignore_errors=True)
+
+    def close_writers(self):
+        for writer in self.writers.values():
+            writer.close()
+        self.writers = {}
+
+
+# Opens an export of the run's positions for each export format
+def open_exports(export_formats, run, partition_by=None, append=False):
+    return [PositionExport(export_format, run, partition_by, append) for export_format in export_formats]
+
+
+# Generator stage that writes each position into every export as it streams past, and closes the exports once the stream ends
+# If the stream fails or is abandoned, the exports are discarded instead and the previous exports are left alone
+def export_stage(positions, exports):
+    try:
+        for position in positions:
+            for export in exports:
+                export.write(position)
+            yield position
+    except BaseException:
+        for export in exports:
+            export.discard()
+        raise
+
+    for export in exports:
+        export.close()
+
+
+POSITION_STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS positions (
+    link_key TEXT PRIMARY KEY,
+    link TEXT NOT NULL,
+    company TEXT,
+    title TEXT,
+    location TEXT,
+    first_seen TEXT,
+    last_seen TEXT,
+    seen INTEGER NOT NULL DEFAULT 0,
+    content_hash TEXT,
+    changed TEXT,
+    previous_title TEXT,
+    previous_location TEXT
+);
+CREATE INDEX IF NOT EXISTS positions_company ON positions (company);
+CREATE INDEX IF NOT EXISTS positions_location ON positions (location);
+CREATE INDEX IF NOT EXISTS positions_last_seen ON positions (last_seen, seen);
+CREATE INDEX IF NOT EXISTS positions_first_seen ON positions (first_seen);
+CREATE TABLE IF NOT EXISTS runs (
+    started TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS run_boards (
+    run TEXT NOT NULL,
+    board TEXT NOT NULL,
+    PRIMARY KEY (run, board)
+);
+CREATE VIEW IF NOT EXISTS latest_positions AS
+    SELECT company, title, link, location, first_seen, seen FROM positions
+    WHERE last_seen = (SELECT MAX(started) FROM runs);
+"""
+
+# Columns added to the positions table after it was first released, added to older databases when they're opened
+POSITION_STORE_MIGRATIONS = {
+    "content_hash": "ALTER TABLE positions ADD COLUMN content_hash TEXT",
+    "changed": "ALTER TABLE positions ADD COLUMN changed TEXT",
+    "previous_title": "ALTER TABLE positions ADD COLUMN previous_title TEXT",
+    "previous_location": "ALTER TABLE positions ADD COLUMN previous_location TEXT",
+    "board": "ALTER TABLE positions ADD COLUMN board TEXT",
+    "seen_in_file": "ALTER TABLE positions ADD COLUMN seen_in_file INTEGER NOT NULL DEFAULT 0",
+}
+POSITION_STORE_INDEXES = """
+CREATE INDEX IF NOT EXISTS positions_changed ON positions (changed);
+CREATE INDEX IF NOT EXISTS positions_board ON positions (board, last_seen);
+"""
+
+# A position whose title or location hash differs from the stored one is stamped as changed in this run,
+# and the title and location it had before are kept so the change can be exported
+UPSERT_POSITION = """
+INSERT INTO positions (link_key, link, company, title, location, first_seen, last_seen, content_hash, board) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (link_key) DO UPDATE SET
+    link = excluded.link, company = excluded.company, title = excluded.title, location = excluded.location,
+    first_seen = COALESCE(positions.first_seen, excluded.first_seen), last_seen = excluded.last_seen,
+    board = COALESCE(excluded.board, positions.board),
+    content_hash = excluded.content_hash,
+    changed = CASE WHEN positions.content_hash != excluded.content_hash THEN excluded.last_seen ELSE positions.changed END,
+    previous_title = CASE WHEN positions.content_hash != excluded.content_hash THEN positions.title ELSE positions.previous_title END,
+    previous_location = CASE WHEN positions.content_hash != excluded.content_hash THEN positions.location ELSE positions.previous_location END
+"""
+
+
+# Key a position is stored under, links are compared case insensitively like the already seen links always have been
+def get_position_key(link):
+    return link.lower()
+
+
+# Hash of a position's title and location, ignoring case and whitespace, that is compared between runs to find changed positions
+def get_content_hash(position):
+    content = "\n".join(" ".join((position[field] or "").lower().split()) for field in ["Title", "Location"])
+    return hashlib.sha1(content.encode()).hexdigest()
+
+
+# Local SQLite store of every position ever scraped, with when it was first and last scraped and whether it has been reviewed
+# Links already reviewed can be marked as seen without the position having been scraped, those rows have no company, title or location
+class PositionStore:
+    def __init__(self, file_name=POSITIONS_DATABASE_FILE):
+        self.connection = sqlite3.connect(file_name)
+        self.connection.executescript(POSITION_STORE_SCHEMA)
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(positions)")}
+        with self.connection:
+            for column, migration in POSITION_STORE_MIGRATIONS.items():
+                if column not in columns:
+                    self.connection.execute(migration)
+        self.connection.executescript(POSITION_STORE_INDEXES)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    # Starts a new run and returns its timestamp, every position scraped during the run is stamped with it
+    def start_run(self):
+        run = datetime.now().isoformat()
+        with self.connection:
+            self.connection.execute("INSERT INTO runs (started) VALUES (?)", (run,))
+        return run
+
+    # Marks links as seen for good, like --mark-seen does, these stay seen whatever already_seen_links.txt holds
+    def mark_seen(self, links):
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO positions (link_key, link, seen) VALUES (?, ?, 1) ON CONFLICT (link_key) DO UPDATE SET seen = 1, seen_in_file = 0",
+                [(get_position_key(link), link) for link in links if link != ""]
+            )
+
+    # Makes the links seen because of already_seen_links.txt match the file again, so links removed from it are unseen on the next run
+    # Links that were already marked seen some other way keep that mark instead of being tied to the file
+    def sync_seen_links(self, links):
+        with self.connection:
+            self.connection.execute("CREATE TEMP TABLE IF NOT EXISTS seen_links (link_key TEXT PRIMARY KEY)")
+            self.connection.execute("DELETE FROM temp.seen_links")
+            self.connection.executemany("INSERT OR IGNORE INTO temp.seen_links (link_key) VALUES (?)", [(get_position_key(link),) for link in links if link != ""])
+            self.connection.execute("UPDATE positions SET seen = 0, seen_in_file = 0 WHERE seen_in_file = 1 AND link_key NOT IN (SELECT link_key FROM temp.seen_links)")
+            self.connection.executemany(
+                "INSERT INTO positions (link_key, link, seen, seen_in_file) VALUES (?, ?, 1, 1) "
+                "ON CONFLICT (link_key) DO UPDATE SET seen_in_file = positions.seen_in_file OR positions.seen = 0, seen = 1",
+                [(get_position_key(link), link) for link in links if link != ""]
+            )
+            self.connection.execute("DROP TABLE temp.seen_links")
+
+    # Inserts or updates every position in one transaction, positions scraped more than once in a run are stored once
+    # Every job board the positions were scraped from is recorded as scraped in the run
+    def upsert_positions(self, positions, run):
+        rows = [
+            (get_position_key(position["Link"]), position["Link"], position["Company"], position["Title"], position["Location"], run, run,
+             get_content_hash(position), getattr(position, "board", None))
+            for position in positions
+        ]
+        with self.connection:
+            self.connection.executemany(UPSERT_POSITION, rows)
+            self.connection.executemany("INSERT OR IGNORE INTO run_boards (run, board) VALUES (?, ?)",
+                                        [(run, board) for board in {row[-1] for row in rows} if board is not None])
+
+    # Looks up whether a position has been seen and when it was first scraped, or None if it isn't in the store
+    def lookup(self, link):
+        return self.connection.execute("SELECT seen, first_seen FROM positions WHERE link_key = ?", (get_position_key(link),)).fetchone()
+
+    # Gets the positions scraped in a run that haven't been reviewed yet, sorted alphabetically by company name
+    # If new_only, only gets the positions that were scraped for the first time in that run
+    def get_unseen_positions(self, run, new_only=False):
+        rows = self.connection.execute(
+            "SELECT company, title, link, location FROM positions WHERE last_seen = ? AND seen = 0" +
+            (" AND first_seen = ?" if new_only else "") + " ORDER BY company",
+            (run, run) if new_only else (run,)
+        )
+
+        return [Position(company, title, link, location) for company, title, link, location in rows]
+
+    # Gets the unseen positions every company had when its job boards were last scraped, from (company, run) pairs, sorted alphabetically by company name
+    # If new_only, only gets the positions that were scraped for the first time in the run that last scraped them
+    def get_latest_unseen_positions(self, latest_runs, new_only=False):
+        with self.connection:
+            self.connection.execute("CREATE TEMP TABLE IF NOT EXISTS latest_runs (company TEXT, run TEXT)")
+            self.connection.execute("DELETE FROM latest_runs")
+            self.connection.executemany("INSERT INTO latest_runs (company, run) VALUES (?, ?)", latest_runs)
+
+        rows = self.connection.execute(
+            "SELECT company, title, link, location FROM positions JOIN latest_runs USING (company) WHERE last_seen = latest_runs.run AND seen = 0" +
+            (" AND first_seen = last_seen" if new_only else "") + " ORDER BY company"
+        )
+
+        return [Position(company, title, link, location) for company, title, link, location in rows]
+
+    # Gets the timestamp of the latest run and how many positions it has scraped so far, or (None, 0) if there hasn't been a run
+    def get_latest_run(self):
+        run = self.connection.execute("SELECT MAX(started) FROM runs").fetchone()[0]
+        return run, self.connection.execute("SELECT COUNT(*) FROM positions WHERE last_seen = ?", (run,)).fetchone()[0]
+
+    # Gets (key, position, first scraped, last scraped) of every position scraped in the given run or after it, or of every position if no run is given
+    def get_positions_scraped_since(self, run=None):
+        rows = self.connection.execute(
+            "SELECT link_key, company, title, link, location, first_seen, last_seen, board FROM positions WHERE company IS NOT NULL" +
+            (" AND last_seen >= ?" if run is not None else ""), (run,) if run is not None else ()
+        )
+        for key, company, title, link, location, first_seen, last_seen, board in rows:
+            yield key, Position(company, title, link, location, board), first_seen, last_seen
+
+    def get_seen_keys(self):
+        return {key for key, in self.connection.execute("SELECT link_key FROM positions WHERE seen = 1")}
+
+    # Gets the timestamp of the run before this one, or None if this is the first run
+    def get_previous_run(self, run):
+        return self.connection.execute("SELECT MAX(started) FROM runs WHERE started < ?", (run,)).fetchone()[0]
+
+    # Gets the positions scraped for the first time in a run
+    # Each of the diff queries walks an index and yields rows as they're read, so they run in linear time and constant memory
+    def get_added_positions(self, run):
+        rows = self.connection.execute("SELECT company, title, link, location FROM positions WHERE first_seen = ? ORDER BY company", (run,))
+        for company, title, link, location in rows:
+            yield Position(company, title, link, location)
+
+    # Gets the positions scraped in the previous run that weren't scraped in this one
+    # Only job boards scraped in both runs are compared, a job board without a single position scraped in this run most likely failed to scrape
+    # Positions stored before job boards were recorded fall back to comparing their company
+    def get_removed_positions(self, run):
+        previous_run = self.get_previous_run(run)
+        if previous_run is None:
+            return
+
+        rows = self.connection.execute(
+            "SELECT company, title, link, location FROM positions WHERE last_seen = ? AND ("
+            "board IN (SELECT board FROM run_boards WHERE run = ?) OR "
+            "(board IS NULL AND company IN (SELECT company FROM positions WHERE last_seen = ?))) ORDER BY company",
+            (previous_run, run, run)
+        )
+        for company, title, link, location in rows:
+            yield Position(company, title, link, location)
+
+    # Gets (position, previous title, previous location) for the positions scraped in an earlier run whose title or location changed in this run
+    def get_changed_positions(self, run):
+        rows = self.connection.execute(
+            "SELECT company, title, link, location, previous_title, previous_location FROM positions "
+            "WHERE changed = ? AND first_seen != ? ORDER BY company",
+            (run, run)
+        )
+        for company, title, link, location, previous_title, previous_location in rows:
+            yield Position(company, title, link, location), previous_title, previous_location
+
+
+# Generator stage that saves positions into the store in batches as they stream past
+# Drops positions that have already been reviewed and, if new_only, positions that were scraped in an earlier run
+# A position scraped twice in one run, e.g. from overlapping job boards, is only passed on once, like the store only holds it once
+def store_stage(positions, store, run, new_only=False, batch_size=STORE_BATCH_SIZE):
+    batch = []
+    yielded_keys = set()
+    positions_in = 0
+    positions_kept = 0
+
+    for position in positions:
+        positions_in += 1
+        stored = store.lookup(position["Link"])
+        batch.append(position)
+        if len(batch) >= batch_size:
+            store.upsert_positions(batch, run)
+            batch = []
+
+        key = get_position_key(position["Link"])
+        if key in yielded_keys:
+            continue
+        if stored is None or (not stored[0] and not (new_only and stored[1] is not None and stored[1] != run)):
+            yielded_keys.add(key)
+            positions_kept += 1
+            yield position
+
+    store.upsert_positions(batch, run)
+    run_metrics.add_filter("Position Store", positions_in, positions_in - positions_kept)
+
+
+# Generator stage that marks positions as seen in the store in batches as they stream past
+def mark_seen_stage(positions, store, batch_size=STORE_BATCH_SIZE):
+    links = []
+
+    for position in positions:
+        links.append(position["Link"])
+        if len(links) >= batch_size:
+            store.mark_seen(links)
+            links = []
+        yield position
+
+    store.mark_seen(links)
+
+
+CHECKPOINT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    started REAL NOT NULL,
+    run TEXT
+);
+CREATE TABLE IF NOT EXISTS boards (
+    key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    positions TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    board TEXT NOT NULL,
+    page TEXT NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (board, page)
+);
+"""
+
+
+# Key a job board's progress is checkpointed under, a hash of the kind of board and its whole entry in the companies file
+def get_board_key(kind, job_board):
+    return hashlib.sha1(json.dumps([kind, job_board], sort_keys=True).encode()).hexdigest()
+
+
+# Stamps each position with the key of the job board it was scraped from, so the store knows which job boards were scraped in a run
+def set_board(positions, key):
+    for position in positions:
+        position.board = key
+    return positions
+
+
+# SQLite file of the job boards, and the pages of paginated job boards, that the current run has scraped so far
+# If a run dies, the next run picks up where it left off and only scrapes what's missing. The file is deleted once a run finishes
+# Checkpoints older than CHECKPOINT_MAX_AGE are thrown away rather than resumed, their positions would be out of date
+# Shared by the fetch engine's thread and every browser thread, so every statement holds the lock and is committed straight away
+class Checkpoint:
+    def __init__(self, file_name=CHECKPOINT_FILE, restart=False):
+        self.file_name = file_name
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(file_name, check_same_thread=False)
+        self.connection.executescript(CHECKPOINT_SCHEMA)
+
+        started = self.connection.execute("SELECT started, run FROM runs").fetchone()
+        if restart or started is None or time.time() - started[0] > CHECKPOINT_MAX_AGE:
+            with self.connection:
+                for table in ["runs", "boards", "pages"]:
+                    self.connection.execute("DELETE FROM " + table)
+                self.connection.execute("INSERT INTO runs (started) VALUES (?)", (time.time(),))
+            self.run = None
+            return
+
+        self.run = started[1]
+
+        boards = self.connection.execute("SELECT COUNT(*) FROM boards").fetchone()[0]
+        pages = self.connection.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+        print("Resuming the unfinished run in " + file_name + ", " + str(boards) + " job boards and " + str(pages) + " pages were already scraped "
+              "(run with --restart to scrape everything again)")
+
+    # Starts a new run in the position store, or carries on with the run being resumed
+    # so positions scraped before the run died still count as first scraped in this run
+    def start_run(self, store):
+        if self.run is None:
+            self.run = store.start_run()
+            with self.lock, self.connection:
+                self.connection.execute("UPDATE runs SET run = ?", (self.run,))
+        return self.run
+
+    # Gets the positions of a job board the run has already scraped, or None if it hasn't been scraped yet
+    def get_board(self, key):
+        with self.lock:
+            row = self.connection.execute("SELECT positions FROM boards WHERE key = ?", (key,)).fetchone()
+        return None if row is None else json.loads(row[0], object_hook=Position.from_json)
+
+    # Saves the positions of a scraped job board, boards without any positions most likely failed and are scraped again on resume
+    def put_board(self, key, name, positions):
+        if len(positions) == 0:
+            return
+
+        with self.lock, self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO boards (key, name, positions) VALUES (?, ?, ?)",
+                                    (key, name, json.dumps(positions, default=Position.to_json)))
+            self.connection.execute("DELETE FROM pages WHERE board = ?", (key,))
+
+    def get_page(self, board, page):
+        with self.lock:
+            row = self.connection.execute("SELECT result FROM pages WHERE board = ? AND page = ?", (board, page)).fetchone()
+        return None if row is None else json.loads(row[0], object_hook=Position.from_json)
+
+    def put_page(self, board, page, result):
+        with self.lock, self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO pages (board, page, result) VALUES (?, ?, ?)",
+                                    (board, page, json.dumps(result, default=Position.to_json)))
+
+    # The pages of one job board, handed to its scraper so it can skip the pages it has already scraped
+    def pages(self, key):
+        return CheckpointPages(self, key)
+
+    def close(self):
+        self.connection.close()
+
+    # Deletes the checkpoint once the run has finished, so the next run starts from scratch
+    def finish(self):
+        self.close()
+        os.remove(self.file_name)
+
+
+class CheckpointPages:
+    def __init__(self, checkpoint, board):
+        self.checkpoint = checkpoint
+        self.board = board
+
+    def get(self, page):
+        return self.checkpoint.get_page(self.board, page)
+
+    def put(self, page, result):
+        self.checkpoint.put_page(self.board, page, result)
+
+
+WORK_QUEUE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id INTEGER PRIMARY KEY,
+    created TEXT NOT NULL,
+    finished INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    batch INTEGER NOT NULL REFERENCES batches (id),
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    claimed_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    positions TEXT,
+    metrics TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, kind);
+CREATE INDEX IF NOT EXISTS tasks_batch ON tasks (batch, status);
+"""
+
+
+# SQLite queue of job board scraping tasks, shared by a coordinator and any number of worker processes or machines
+# Each run of the coordinator queues a batch of tasks, workers claim pending tasks from unfinished batches and write back the positions they scraped
+# Tasks go from pending to running to done, or back to pending if their worker fails or disappears, until they run out of attempts and fail
+class WorkQueue:
+    def __init__(self, file_name=WORK_QUEUE_FILE):
+        self.connection = sqlite3.connect(file_name, timeout=60)
+        self.connection.executescript(WORK_QUEUE_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    # Queues each task as (kind, name, payload) in a new batch and returns the batch
+    def add_batch(self, tasks):
+        with self.connection:
+            batch = self.connection.execute("INSERT INTO batches (created) VALUES (?)", (datetime.now().isoformat(),)).lastrowid
+            self.connection.executemany("INSERT INTO tasks (batch, kind, name, payload) VALUES (?, ?, ?, ?)",
+                                        [(batch, kind, name, json.dumps(payload)) for kind, name, payload in tasks])
+        return batch
+
+    # Claims the oldest pending task of one of the kinds for the worker, returns (task, name, payload) or None if there isn't one
+    def claim(self, kinds, worker):
+        with self.connection:
+            row = self.connection.execute(
+                "UPDATE tasks SET status = 'running', worker = ?, claimed_at = ?, attempts = attempts + 1 WHERE id = ("
+                "SELECT tasks.id FROM tasks JOIN batches ON batches.id = tasks.batch WHERE tasks.status = 'pending' AND batches.finished = 0 "
+                "AND tasks.kind IN (" + ", ".join("?" for _ in kinds) + ") ORDER BY tasks.id LIMIT 1) RETURNING id, name, payload",
+                [worker, time.time()] + list(kinds)
+            ).fetchone()
+
+        return None if row is None else (row[0], row[1], json.loads(row[2]))
+
+    def complete(self, task, positions, metrics):
+        with self.connection:
+            self.connection.execute("UPDATE tasks SET status = 'done', positions = ?, metrics = ? WHERE id = ?",
+                                    (json.dumps(positions, default=Position.to_json), json.dumps(metrics), task))
+
+    # Hands a failed task out again, unless it has already been attempted too many times
+    def fail(self, task, error):
+        with self.connection:
+            self.connection.execute("UPDATE tasks SET status = CASE WHEN attempts < ? THEN 'pending' ELSE 'failed' END, error = ? WHERE id = ?",
+                                    (MAX_TASK_ATTEMPTS, error, task))
+
+    # Hands out again the tasks of a batch whose workers have been running them for longer than the timeout
+    def requeue_stale(self, batch, timeout=TASK_TIMEOUT):
+        with self.connection:
+            self.connection.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts < ? THEN 'pending' ELSE 'failed' END, error = 'Timed out on ' || worker "
+                "WHERE batch = ? AND status = 'running' AND claimed_at < ?", (MAX_TASK_ATTEMPTS, batch, time.time() - timeout))
+
+    # Counts the tasks of a batch in each status
+    def get_progress(self, batch):
+        return dict(self.connection.execute("SELECT status, COUNT(*) FROM tasks WHERE batch = ? GROUP BY status", (batch,)))
+
+    # Yields (name, positions, metrics) for every task of the batch that is done
+    def get_results(self, batch):
+        for name, positions, metrics in self.connection.execute("SELECT name, positions, metrics FROM tasks WHERE batch = ? AND status = 'done' ORDER BY id", (batch,)):
+            yield name, json.loads(positions, object_hook=Position.from_json), json.loads(metrics)
+
+    # Gets (name, error) for every task of the batch that failed
+    def get_failures(self, batch):
+        return self.connection.execute("SELECT name, error FROM tasks WHERE batch = ? AND status = 'failed' ORDER BY id", (batch,)).fetchall()
+
+    # Stops handing out the batch's tasks and drops their results, which the coordinator has already merged
+    def finish_batch(self, batch):
+        with self.connection:
+            self.connection.execute("UPDATE batches SET finished = 1 WHERE id = ?", (batch,))
+            self.connection.execute("DELETE FROM tasks WHERE batch = ?", (batch,))
+
+
+# Lists every Selenium scraper job for the custom job boards as (scraper, argument, browser profile)
+def get_custom_job_board_jobs(all_companies):
+    return [(get_positions_on_selenium_board, job_board, get_browser_profile(job_board)) for job_board in all_companies["selenium"]]
+
+
+# Selenium scrapers by name, so workers can look up the scraper of a task
+SELENIUM_SCRAPERS = {scraper.__name__: scraper for scraper in [get_positions_on_selenium_board]}
+
+
+# Lists every job board as a work queue task of (kind, name, payload)
+def get_work_queue_tasks(all_companies):
+    return [
+        (HTTP_TASK, get_ats_board_name(ats, job_board), {"ATS": ats, "Job Board": job_board}) for ats in ATS_NAMES for job_board in all_companies[ats]
+    ] + [
+        (BROWSER_TASK, get_job_name(job), {"Scraper": job[0].__name__, "Argument": job[1], "Profile": job[2]}) for job in get_custom_job_board_jobs(all_companies)
+    ]
+
+
+SCHEDULE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS boards (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    company TEXT NOT NULL,
+    interval REAL NOT NULL,
+    next_due REAL NOT NULL,
+    fingerprint TEXT,
+    scrapes INTEGER NOT NULL DEFAULT 0,
+    changes INTEGER NOT NULL DEFAULT 0,
+    last_scraped REAL,
+    last_changed REAL,
+    last_run TEXT
+);
+CREATE INDEX IF NOT EXISTS boards_next_due ON boards (kind, next_due);
+"""
+
+
+# Lists every job board for the scheduler by its key, as (kind of task, name, company, scraper target)
+# The target is (ATS, job board) for Greenhouse, Lever and Workday job boards and the Selenium job for custom job boards
+def get_scheduled_boards(all_companies):
+    boards = {}
+    for ats in ATS_NAMES:
+        for job_board in all_companies[ats]:
+            boards[get_board_key(ats, job_board)] = (HTTP_TASK, get_ats_board_name(ats, job_board), job_board["Company"], (ats, job_board))
+    for job in get_custom_job_board_jobs(all_companies):
+        boards[get_board_key("selenium", job[1])] = (BROWSER_TASK, get_job_name(job), job[1]["Company Name"], job)
+
+    return boards
+
+
+# Hash of every position on a job board, which changes whenever a position is added, removed or changes title or location
+def get_board_fingerprint(positions):
+    return hashlib.sha1("\n".join(sorted(get_position_key(position["Link"]) + " " + get_content_hash(position) for position in positions)).encode()).hexdigest()
+
+
+# SQLite database of when each job board is next due to be scraped and how often its positions have changed
+# Each job board's refresh interval adapts to how often it changes, like the per-host request rate does to throttling:
+# it's divided when the board changed since its last scrape and grows when it didn't, so hot boards are scraped often and stale ones rarely
+class BoardSchedule:
+    def __init__(self, file_name=SCHEDULE_FILE):
+        self.connection = sqlite3.connect(file_name)
+        self.connection.executescript(SCHEDULE_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    # Adds the job boards that are new to the companies files, due straight away, and forgets the ones that were removed from them
+    def sync(self, boards):
+        now = time.time()
+        with self.connection:
+            self.connection.executemany("INSERT OR IGNORE INTO boards (key, kind, name, company, interval, next_due) VALUES (?, ?, ?, ?, ?, ?)",
+                                        [(key, kind, name, company, INITIAL_REFRESH_INTERVAL, now) for key, (kind, name, company, _) in boards.items()])
+            removed = [key for key, in self.connection.execute("SELECT key FROM boards") if key not in boards]
+            self.connection.executemany("DELETE FROM boards WHERE key = ?", [(key,) for key in removed])
+
+    # Gets the keys of the job boards that are due, at most the budget of each kind of task, most overdue for their refresh interval first
+    # Hot job boards have short intervals, so they're overdue by more of their interval and go ahead of stale job boards due at the same time
+    def get_due(self, budgets):
+        now = time.time()
+        due = []
+        for kind, budget in budgets.items():
+            rows = self.connection.execute("SELECT key, interval, next_due FROM boards WHERE kind = ? AND next_due <= ?", (kind, now))
+            due += [key for _, key in heapq.nsmallest(budget, (((next_due - now) / interval, key) for key, interval, next_due in rows))]
+
+        return due
+
+    # Seconds until the next job board is due, or None if there aren't any job boards
+    def get_time_until_due(self):
+        next_due = self.connection.execute("SELECT MIN(next_due) FROM boards").fetchone()[0]
+        return None if next_due is None else max(next_due - time.time(), 0)
+
+    # Records a scrape of a job board and schedules its next one, returns whether its positions changed since its last scrape
+    # A job board without any positions most likely failed to scrape, so it's tried again soon without touching its history
+    def record(self, key, positions, run):
+        now = time.time()
+        interval, previous_fingerprint = self.connection.execute("SELECT interval, fingerprint FROM boards WHERE key = ?", (key,)).fetchone()
+
+        if len(positions) == 0:
+            with self.connection:
+                self.connection.execute("UPDATE boards SET next_due = ? WHERE key = ?", (now + min(interval, FAILED_BOARD_RETRY_INTERVAL), key))
+            return False
+
+        # The first scrape of a job board has nothing to compare to, so it keeps its initial interval
+        fingerprint = get_board_fingerprint(positions)
+        changed = previous_fingerprint is not None and fingerprint != previous_fingerprint
+        if previous_fingerprint is not None:
+            interval = max(interval / REFRESH_INTERVAL_SHRINK, MIN_REFRESH_INTERVAL) if changed else min(interval * REFRESH_INTERVAL_GROWTH, MAX_REFRESH_INTERVAL)
+
+        with self.connection:
+            self.connection.execute(
+                "UPDATE boards SET interval = ?, next_due = ?, fingerprint = ?, scrapes = scrapes + 1, changes = changes + ?, last_scraped = ?, "
+                "last_changed = CASE WHEN ? THEN ? ELSE last_changed END, last_run = ? WHERE key = ?",
+                (interval, now + interval, fingerprint, int(changed), now, changed, now, run, key)
+            )
+        return changed
+
+    # Gets (company, run) of the latest successful scrape of every job board, so every job board's latest positions can be exported
+    def get_latest_runs(self):
+        return self.connection.execute("SELECT DISTINCT company, last_run FROM boards WHERE last_run IS NOT NULL").fetchall()
+
+
+# Scrapes every job board in background threads and yields positions as soon as each job board has been scraped
+# Holds back the scrapers while too many scraped job boards are waiting to be consumed, so memory use stays flat
+def stream_positions(all_companies, max_concurrent_requests=MAX_CONCURRENT_REQUESTS, max_requests_per_host=MAX_REQUESTS_PER_HOST,
+                     browser_pool_size=BROWSER_POOL_SIZE, use_ats_apis=True, use_cache=True, parse_processes=PARSE_PROCESSES, use_data_sources=True,
+                     checkpoint=None):
+    scraped = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+    finished = object()
+    errors = []
+
+    def scrape_ats():
+        asyncio.run(get_positions_on_ats(all_companies, max_concurrent_requests, max_requests_per_host, use_ats_apis, use_cache, emit=scraped.put,
+                                        parse_processes=parse_processes, checkpoint=checkpoint))
+
+    def scrape_custom_job_boards():
+        with BrowserPool(browser_pool_size) as pool, open_data_sources(use_data_sources) as data_sources:
+            get_positions_using_selenium(pool, get_custom_job_board_jobs(all_companies), emit=scraped.put, data_sources=data_sources, checkpoint=checkpoint)
+
+    def run_producer(scraper):
+        try:
+            scraper()
+        except BaseException as error:
+            errors.append(error)
+        finally:
+            scraped.put(finished)
+
+    producers = [threading.Thread(target=run_producer, args=(scraper,), daemon=True) for scraper in [scrape_ats, scrape_custom_job_boards]]
+    for producer in producers:
+        producer.start()
+
+    running = len(producers)
+    while running > 0:
+        positions = scraped.get()
+        if positions is finished:
+            running -= 1
+        else:
+            yield from positions
+
+    if len(errors) > 0:
+        raise errors[0]
+
+
+# Scrapes a Greenhouse, Lever or Workday task from the work queue and writes back its positions and metrics
+async def run_http_task(work_queue, engine, task, use_ats_apis=True):
+    task_id, name, payload = task
+
+    try:
+        positions = await get_positions_on_ats_board(engine, payload["ATS"], payload["Job Board"], use_ats_apis)
+    except Exception as error:
+        print("\tERROR:", name, "could not be scraped!")
+        work_queue.fail(task_id, repr(error))
+        return
+
+    work_queue.complete(task_id, positions, run_metrics.pop_scraper(name))
+
+
+# Keeps up to HTTP_WORKER_TASKS Greenhouse, Lever and Workday tasks from the work queue running on one shared fetch engine
+# Waits for more tasks once the queue is empty, or returns if exit_when_done
+# Each worker keeps its own response cache, so workers sharing a directory don't overwrite each other's cache when they save it
+async def run_http_tasks(work_queue, worker, max_concurrent_requests=MAX_CONCURRENT_REQUESTS, max_requests_per_host=MAX_REQUESTS_PER_HOST,
+                         use_ats_apis=True, use_cache=True, parse_processes=PARSE_PROCESSES, exit_when_done=False):
+    cache = ResponseCache(get_worker_file(RESPONSE_CACHE_FILE, worker)) if use_cache else None
+    engine = FetchEngine(max_concurrent_requests, max_requests_per_host, cache, parse_processes)
+    running = set()
+
+    try:
+        while True:
+            while len(running) < HTTP_WORKER_TASKS:
+                task = work_queue.claim([HTTP_TASK], worker)
+                if task is None:
+                    break
+                running.add(asyncio.ensure_future(run_http_task(work_queue, engine, task, use_ats_apis)))
+
+            if len(running) > 0:
+                _, running = await asyncio.wait(running, timeout=WORKER_POLL_INTERVAL, return_when=asyncio.FIRST_COMPLETED)
+                continue
+
+            # Saves the response cache whenever the worker runs out of tasks
+            if cache is not None:
+                cache.save()
+            if exit_when_done:
+                return
+            await asyncio.sleep(WORKER_POLL_INTERVAL)
+    finally:
+        engine.close()
+        if cache is not None:
+            cache.save()
+
+
+# Scrapes custom job board tasks from the work queue one at a time on browsers borrowed from the pool
+# Waits for more tasks once the queue is empty, or returns if exit_when_done
+def run_browser_tasks(work_queue_file, worker, pool, exit_when_done=False, data_sources=None):
+    with WorkQueue(work_queue_file) as work_queue:
+        while True:
+            task = work_queue.claim([BROWSER_TASK], worker)
+            if task is None:
+                if exit_when_done:
+                    return
+                time.sleep(WORKER_POLL_INTERVAL)
+                continue
+
+            task_id, name, payload = task
+            try:
+                positions = run_with_pooled_browser(pool, (SELENIUM_SCRAPERS[payload["Scraper"]], payload["Argument"], payload["Profile"]), data_sources)
+            except Exception as error:
+                print("\tERROR:", name, "could not be scraped!")
+                work_queue.fail(task_id, repr(error))
+                continue
+
+            work_queue.complete(task_id, positions, run_metrics.pop_scraper(name))
+
+
+# File of a worker's own copy of a file that would otherwise be shared, like response_cache.json becoming response_cache.<worker>.json
+def get_worker_file(file_name, worker):
+    base, extension = os.path.splitext(file_name)
+    return base + "." + re.sub(r"[^\w.-]", "_", worker) + extension
+
+
+# Runs as a worker, scraping tasks of the given kinds from the work queue until interrupted, or until the queue is empty if exit_when_done
+# HTTP tasks run on one fetch engine, browser tasks run in parallel on as many browsers as the pool has
+# Workers are named after their host and process unless given a name, a worker restarted under the same name picks up its response cache again
+def run_worker(work_queue_file=WORK_QUEUE_FILE, kinds=(HTTP_TASK, BROWSER_TASK), max_concurrent_requests=MAX_CONCURRENT_REQUESTS,
+               max_requests_per_host=MAX_REQUESTS_PER_HOST, browser_pool_size=BROWSER_POOL_SIZE, use_ats_apis=True, use_cache=True,
+               parse_processes=PARSE_PROCESSES, exit_when_done=False, use_data_sources=True, worker=None):
+    worker = worker or socket.gethostname() + ":" + str(os.getpid())
+    print("Working on " + " and ".join(kinds) + " tasks from " + work_queue_file + " as " + worker)
+
+    def scrape_http_tasks():
+        with WorkQueue(work_queue_file) as work_queue:
+            asyncio.run(run_http_tasks(work_queue, worker, max_concurrent_requests, max_requests_per_host, use_ats_apis, use_cache, parse_processes, exit_when_done))
+
+    with BrowserPool(browser_pool_size) as pool, open_data_sources(use_data_sources and BROWSER_TASK in kinds) as data_sources:
+        threads = []
+        if HTTP_TASK in kinds:
+            threads.append(threading.Thread(target=scrape_http_tasks, daemon=True))
+        if BROWSER_TASK in kinds:
+            threads += [threading.Thread(target=run_browser_tasks, args=(work_queue_file, worker, pool, exit_when_done, data_sources), daemon=True)
+                        for _ in range(pool.size)]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    print("Done!")
+
+
+def scrape(all_companies, blacklisted_position_titles, required_keywords, blacklisted_keywords, whitelisted_locations, blacklisted_locations, already_seen_links,
+           max_concurrent_requests=MAX_CONCURRENT_REQUESTS, max_requests_per_host=MAX_REQUESTS_PER_HOST, browser_pool_size=BROWSER_POOL_SIZE,
+           use_ats_apis=True, use_cache=True, stream=False, sort=True, database_file=POSITIONS_DATABASE_FILE, new_only=False, mark_seen=False,
+           report_file=RUN_REPORT_FILE, prometheus_file=None, parse_processes=PARSE_PROCESSES, coordinate=False, work_queue_file=WORK_QUEUE_FILE,
+           location_aliases=None, diff=False, use_data_sources=True, checkpoint_file=CHECKPOINT_FILE, restart=False, export_formats=(), partition_by=None,
+           append_exports=False):
+    run_metrics.reset()
+
+    try:
+        with PositionStore(database_file) as store:
+            store.sync_seen_links(already_seen_links)
+            # Workers keep their own progress in the work queue, so only runs that scrape everything themselves are checkpointed
+            checkpoint = None if coordinate else Checkpoint(checkpoint_file, restart)
+            run = checkpoint.start_run(store) if checkpoint is not None else store.start_run()
+            exports = open_exports(export_formats, run, partition_by, append_exports)
+            position_filter = PositionFilter(blacklisted_position_titles, required_keywords, blacklisted_keywords, whitelisted_locations, blacklisted_locations,
+                                             location_aliases=location_aliases)
+
+            try:
+                if coordinate:
+                    scrape_with_workers(all_companies, position_filter, store, run, work_queue_file, new_only, mark_seen, exports)
+                elif stream:
+                    scrape_streaming(all_companies, position_filter, store, run, max_concurrent_requests, max_requests_per_host, browser_pool_size,
+                                     use_ats_apis, use_cache, sort, new_only, mark_seen, parse_processes, use_data_sources, checkpoint, exports)
+                else:
+                    scrape_all_at_once(all_companies, position_filter, store, run, max_concurrent_requests, max_requests_per_host, browser_pool_size,
+                                       use_ats_apis, use_cache, new_only, mark_seen, parse_processes, use_data_sources, checkpoint, exports)
+
+                if diff:
+                    export_diff(position_filter, store, run)
+            finally:
+                if checkpoint is not None:
+                    checkpoint.close()
+
+            if checkpoint is not None:
+                checkpoint.finish()
+    finally:
+        write_run_report(report_file, prometheus_file)
 
     print("Done!")
 
 
+# Scrapes every job board, then saves, filters and exports all of the positions at once
+def scrape_all_at_once(all_companies, position_filter, store, run, max_concurrent_requests=MAX_CONCURRENT_REQUESTS, max_requests_per_host=MAX_REQUESTS_PER_HOST,
+                       browser_pool_size=BROWSER_POOL_SIZE, use_ats_apis=True, use_cache=True, new_only=False, mark_seen=False, parse_processes=PARSE_PROCESSES,
+                       use_data_sources=True, checkpoint=None, exports=()):
+    print("Getting all positions on Greenhouse, Lever and Workday job boards")
+    with run_metrics.time_step("Scraping Greenhouse, Lever and Workday"):
+        all_positions = asyncio.run(get_positions_on_ats(all_companies, max_concurrent_requests, max_requests_per_host, use_ats_apis, use_cache,
+                                                         parse_processes=parse_processes, checkpoint=checkpoint))
+
+    print("Getting all positions on custom job boards")
+    with run_metrics.time_step("Scraping Custom Job Boards"), BrowserPool(browser_pool_size) as pool, open_data_sources(use_data_sources) as data_sources:
+        all_positions += get_positions_using_selenium(pool, get_custom_job_board_jobs(all_companies), data_sources=data_sources, checkpoint=checkpoint)
+
+    save_filter_and_export(all_positions, position_filter, store, run, new_only, mark_seen, exports=exports)
+
+
+# Queues every job board in the work queue, waits for the workers to scrape them all, then merges their positions
+# and saves, filters and exports them like a run that scraped everything itself
+def scrape_with_workers(all_companies, position_filter, store, run, work_queue_file=WORK_QUEUE_FILE, new_only=False, mark_seen=False, exports=()):
+    all_positions = []
+
+    with WorkQueue(work_queue_file) as work_queue:
+        print("Queueing all job boards in " + work_queue_file + " and waiting for workers to scrape them")
+        batch = work_queue.add_batch(get_work_queue_tasks(all_companies))
+
+        try:
+            with run_metrics.time_step("Waiting For Workers"):
+                wait_for_workers(work_queue, batch)
+
+            for name, positions, metrics in work_queue.get_results(batch):
+                all_positions += positions
+                for metric, amount in metrics.items():
+                    run_metrics.add(metric, amount, name)
+            for name, error in work_queue.get_failures(batch):
+                print("\tERROR:", name, "could not be scraped!", error)
+        finally:
+            work_queue.finish_batch(batch)
+
+    save_filter_and_export(all_positions, position_filter, store, run, new_only, mark_seen, exports=exports)
+
+
+# Waits until every task of the batch is done or has failed, handing out again tasks whose workers have disappeared
+def wait_for_workers(work_queue, batch, task_timeout=TASK_TIMEOUT):
+    last_finished = None
+
+    while True:
+        work_queue.requeue_stale(batch, task_timeout)
+        progress = work_queue.get_progress(batch)
+        finished = progress.get("done", 0) + progress.get("failed", 0)
+
+        if finished != last_finished:
+            print("\t{}/{} job boards scraped".format(finished, sum(progress.values())))
+            last_finished = finished
+        if finished == sum(progress.values()):
+            return
+
+        time.sleep(WORKER_POLL_INTERVAL)
+
+
+# Saves the scraped positions to the position store, then filters the unseen ones and exports them to CSV
+# If the (company, run) of every job board's latest scrape is given, the unseen positions of every job board are exported, not just the ones scraped in this run
+# The same positions are written into each of the exports alongside the CSV file
+def save_filter_and_export(all_positions, position_filter, store, run, new_only=False, mark_seen=False, latest_runs=None, exports=()):
+    print("Saving all positions to the position store")
+    with run_metrics.time_step("Saving To Position Store"):
+        store.upsert_positions(all_positions, run)
+
+    # The store returns the unseen positions sorted alphabetically by company name
+    print("Getting all unseen" + (" new" if new_only else "") + " positions sorted alphabetically by company name")
+    with run_metrics.time_step("Querying Position Store"):
+        if latest_runs is None:
+            filtered_positions = store.get_unseen_positions(run, new_only)
+        else:
+            filtered_positions = store.get_latest_unseen_positions(latest_runs, new_only)
+        run_metrics.add_filter("Position Store", len(all_positions), len(all_positions) - len(filtered_positions))
+
+    print("Filtering all positions by position title keywords, position title and location")
+    with run_metrics.time_step("Filtering"):
+        filtered_positions = position_filter.filter(filtered_positions)
+    print_unsure_locations(position_filter.unsure_locations)
+
+    print("Exporting all positions to CSV file" + "".join(", " + export.directory for export in exports))
+    with run_metrics.time_step("Exporting"):
+        export_to_csv(export_stage(filtered_positions, exports))
+
+    if mark_seen:
+        store.mark_seen([position["Link"] for position in filtered_positions])
+
+
+# Exports the positions that were added, removed or changed since the previous run into their own CSV files
+# Only positions that make it through the filters are exported, whether or not they have been seen
+def export_diff(position_filter, store, run):
+    changed = filter_stage(store.get_changed_positions(run), lambda change: position_filter.keeps(change[0]), "Diff: Changed")
+    diffs = [
+        ("Added", filter_stage(store.get_added_positions(run), position_filter.keeps, "Diff: Added"), ADDED_POSITIONS_FILE, CSV_FIELDS),
+        ("Removed", filter_stage(store.get_removed_positions(run), position_filter.keeps, "Diff: Removed"), REMOVED_POSITIONS_FILE, CSV_FIELDS),
+        ("Changed", (dict(position.to_dict(), **{"Previous Title": previous_title, "Previous Location": previous_location})
+                     for position, previous_title, previous_location in changed), CHANGED_POSITIONS_FILE, CHANGED_CSV_FIELDS),
+    ]
+
+    for name, positions, file_name, fields in diffs:
+        print("Exporting " + name.lower() + " positions since the previous run to " + file_name)
+        with run_metrics.time_step("Exporting " + name + " Positions"):
+            stream_to_csv(positions, file_name, fields)
+
+
+# Writes the run metrics to the JSON run report and, if given, a Prometheus text format file
+def write_run_report(report_file=RUN_REPORT_FILE, prometheus_file=None):
+    run_metrics.print_slowest_scrapers()
+    run_metrics.write_report(report_file)
+    if prometheus_file is not None:
+        run_metrics.write_prometheus(prometheus_file)
+
+
+# Streams positions from the scrapers through the position store and each filter stage into the CSV file as job boards are scraped
+# Sorting by company name is done afterwards as an external merge sort of the CSV file
+def scrape_streaming(all_companies, position_filter, store, run, max_concurrent_requests=MAX_CONCURRENT_REQUESTS, max_requests_per_host=MAX_REQUESTS_PER_HOST,
+                     browser_pool_size=BROWSER_POOL_SIZE, use_ats_apis=True, use_cache=True, sort=True, new_only=False, mark_seen=False,
+                     parse_processes=PARSE_PROCESSES, use_data_sources=True, checkpoint=None, exports=()):
+    print("Streaming all positions through the filters into CSV file as job boards are scraped")
+    positions = stream_positions(all_companies, max_concurrent_requests, max_requests_per_host, browser_pool_size, use_ats_apis, use_cache, parse_processes,
+                                 use_data_sources, checkpoint)
+    positions = store_stage(positions, store, run, new_only)
+    for name, keeps in position_filter.stages:
+        positions = filter_stage(positions, keeps, name)
+    if mark_seen:
+        positions = mark_seen_stage(positions, store)
+    if len(exports) > 0:
+        positions = export_stage(positions, exports)
+    with run_metrics.time_step("Scraping, Filtering And Exporting"):
+        stream_to_csv(positions)
+
+    print_unsure_locations(position_filter.unsure_locations)
+
+    if sort:
+        print("Sorting CSV file alphabetically by company name")
+        with run_metrics.time_step("Sorting"):
+            external_sort_csv()
+
+
+# Runs until interrupted, scraping each job board whenever its refresh interval is up instead of scraping every job board at once
+# Each round scrapes the job boards that are due, up to a budget of each kind, then exports the latest positions of every job board
+def scrape_on_schedule(all_companies, blacklisted_position_titles, required_keywords, blacklisted_keywords, whitelisted_locations, blacklisted_locations,
+                       already_seen_links, max_concurrent_requests=MAX_CONCURRENT_REQUESTS, max_requests_per_host=MAX_REQUESTS_PER_HOST,
+                       browser_pool_size=BROWSER_POOL_SIZE, use_ats_apis=True, use_cache=True, database_file=POSITIONS_DATABASE_FILE, new_only=False,
+                       mark_seen=False, report_file=RUN_REPORT_FILE, prometheus_file=None, parse_processes=PARSE_PROCESSES, location_aliases=None,
+                       use_data_sources=True, schedule_file=SCHEDULE_FILE, http_boards=SCHEDULE_HTTP_BOARDS, browser_boards=SCHEDULE_BROWSER_BOARDS,
+                       export_formats=(), partition_by=None, append_exports=False):
+    boards = get_scheduled_boards(all_companies)
+
+    with PositionStore(database_file) as store, BoardSchedule(schedule_file) as schedule, open_data_sources(use_data_sources) as data_sources:
+        store.sync_seen_links(already_seen_links)
+        schedule.sync(boards)
+        position_filter = PositionFilter(blacklisted_position_titles, required_keywords, blacklisted_keywords, whitelisted_locations, blacklisted_locations,
+                                         location_aliases=location_aliases)
+        print("Scraping " + str(len(boards)) + " job boards whenever they're due in " + schedule_file + " until stopped with Ctrl+C")
+
+        while True:
+            due = schedule.get_due({HTTP_TASK: http_boards, BROWSER_TASK: browser_boards})
+            if len(due) == 0:
+                wait = schedule.get_time_until_due()
+                time.sleep(SCHEDULE_POLL_INTERVAL if wait is None else min(wait, SCHEDULE_POLL_INTERVAL))
+                continue
+
+            run_metrics.reset()
+            try:
+                scrape_due_boards([(key,) + boards[key] for key in due], position_filter, store, schedule, max_concurrent_requests, max_requests_per_host,
+                                  browser_pool_size, use_ats_apis, use_cache, new_only, mark_seen, parse_processes, data_sources, export_formats, partition_by,
+                                  append_exports)
+            except Exception as error:
+                # The round's job boards are still due, so wait a bit before trying them again instead of failing in a tight loop
+                print("ERROR: Scraping the due job boards failed!", repr(error))
+                time.sleep(SCHEDULE_POLL_INTERVAL)
+            finally:
+                write_run_report(report_file, prometheus_file)
+
+            wait = schedule.get_time_until_due()
+            if wait is not None:
+                print("Next job board is due in {:.0f} minutes".format(wait / 60))
+
+
+# Scrapes the due job boards, each given as (key, kind of task, name, company, scraper target), and records each scrape in the schedule
+# Greenhouse, Lever and Workday job boards share one fetch engine, custom job boards run on a browser pool that only launches browsers if any are due
+# A job board whose scraper raises is recorded as a failed scrape, so it's retried soon and doesn't take the rest of the round down with it
+def scrape_due_boards(due_boards, position_filter, store, schedule, max_concurrent_requests=MAX_CONCURRENT_REQUESTS, max_requests_per_host=MAX_REQUESTS_PER_HOST,
+                      browser_pool_size=BROWSER_POOL_SIZE, use_ats_apis=True, use_cache=True, new_only=False, mark_seen=False, parse_processes=PARSE_PROCESSES,
+                      data_sources=None, export_formats=(), partition_by=None, append_exports=False):
+    run = store.start_run()
+    ats_boards = [board for board in due_boards if board[1] == HTTP_TASK]
+    custom_boards = [board for board in due_boards if board[1] == BROWSER_TASK]
+
+    async def scrape_ats_boards():
+        cache = ResponseCache() if use_cache else None
+        engine = FetchEngine(max_concurrent_requests, max_requests_per_host, cache, parse_processes)
+        try:
+            results = await asyncio.gather(*[get_positions_on_ats_board(engine, ats, job_board, use_ats_apis) for _, _, _, _, (ats, job_board) in ats_boards],
+                                           return_exceptions=True)
+        finally:
+            engine.close()
+            if cache is not None:
+                cache.save()
+
+        board_positions = []
+        for (_, _, name, _, _), result in zip(ats_boards, results):
+            if isinstance(result, BaseException) and not isinstance(result, Exception):
+                raise result
+            if isinstance(result, Exception):
+                print("\tERROR:", name, "could not be scraped!", repr(result))
+                result = []
+            board_positions.append(result)
+        return board_positions
+
+    def scrape_custom_board(pool, job):
+        try:
+            return run_with_pooled_browser(pool, job, data_sources=data_sources)
+        except Exception as error:
+            print("\tERROR:", get_job_name(job), "could not be scraped!", repr(error))
+            return []
+
+    print("Getting all positions on " + str(len(ats_boards)) + " Greenhouse, Lever and Workday job boards that are due")
+    with run_metrics.time_step("Scraping Greenhouse, Lever and Workday"):
+        board_positions = asyncio.run(scrape_ats_boards()) if len(ats_boards) > 0 else []
+
+    print("Getting all positions on " + str(len(custom_boards)) + " custom job boards that are due")
+    with run_metrics.time_step("Scraping Custom Job Boards"), BrowserPool(browser_pool_size) as pool, ThreadPoolExecutor(max_workers=pool.size) as executor:
+        board_positions += executor.map(partial(scrape_custom_board, pool), [job for _, _, _, _, job in custom_boards])
+
+    all_positions = []
+    changed = 0
+    for (key, _, _, _, _), positions in zip(ats_boards + custom_boards, board_positions):
+        changed += schedule.record(key, positions, run)
+        all_positions += positions
+    print(str(changed) + " of " + str(len(due_boards)) + " job boards changed since they were last scraped")
+
+    save_filter_and_export(all_positions, position_filter, store, run, new_only, mark_seen, schedule.get_latest_runs(),
+                           open_exports(export_formats, run, partition_by, append_exports))
+
+
+# In-memory index of the positions in the position store, for the query server
+# Titles are indexed by each of their words, companies by name and locations by every normalized location they fall under,
+# so a query only looks at the positions in the smallest of the index entries it asks for
+# Only positions scraped in runs since the last refresh are read from the store, the rest of the index is left as it is
+class PositionIndex:
+    def __init__(self, position_filter=None, location_aliases=None):
+        self.position_filter = position_filter
+        self.location_aliases = location_aliases
+        self.locations = LocationIndex(aliases=location_aliases)
+        self.lock = threading.Lock()
+        self.ids = {}
+        self.entries = []
+        self.titles = {}
+        self.companies = {}
+        self.location_keys = {}
+        self.seen = set()
+        self.latest_runs = {}
+        self.run = None
+        self.run_positions = 0
+        self.ranks = []
+        self.filters = {}
+        self.results = {}
+
+    # Adds the positions scraped since the last refresh, re-indexing the ones that changed, and updates which positions have been seen
+    # The last run is read again in case it was still saving positions, like a streaming run does, the last time the index was refreshed
+    # Returns whether there was anything new
+    def refresh(self, store):
+        run, run_positions = store.get_latest_run()
+        if run is None or (run, run_positions) == (self.run, self.run_positions):
+            return False
+
+        positions = list(store.get_positions_scraped_since(self.run))
+        seen_keys = store.get_seen_keys()
+        with self.lock:
+            for key, position, first_seen, last_seen in positions:
+                self.add(key, position, first_seen, last_seen)
+            self.seen = {self.ids[key] for key in seen_keys if key in self.ids}
+            self.run, self.run_positions = run, run_positions
+            self.rank()
+            self.results = {}
+
+        return True
+
+    def add(self, key, position, first_seen, last_seen):
+        position_id = self.ids.get(key)
+        if position_id is None:
+            position_id = self.ids[key] = len(self.entries)
+            self.entries.append(None)
+        elif self.entries[position_id] == (position, first_seen, last_seen):
+            return
+        else:
+            for index, index_key in self.get_index_keys(self.entries[position_id][0]):
+                index[index_key].discard(position_id)
+
+        self.entries[position_id] = (position, first_seen, last_seen)
+        for index, index_key in self.get_index_keys(position):
+            index.setdefault(index_key, set()).add(position_id)
+        board = self.get_board(position)
+        self.latest_runs[board] = max(self.latest_runs.get(board, last_seen), last_seen)
+
+    # Job board a position's latest run is tracked by, so job boards of one company scraped in different runs are each current
+    # Positions stored before job boards were recorded are tracked by their company instead
+    @staticmethod
+    def get_board(position):
+        return position.board if position.board is not None else position.company
+
+    # Lists (index, key) for every index entry a position belongs in
+    def get_index_keys(self, position):
+        keys = [(self.titles, word) for word in set(TITLE_WORDS.findall(position.lower_title))]
+        keys.append((self.companies, position.company.lower()))
+        for single_location in self.locations.split(position.location):
+            key = self.locations.normalize(single_location)
+            keys += [(self.location_keys, covering_key) for covering_key in self.locations.get_covering_keys(key) + [key[:1]] if len(covering_key) > 0]
+        return keys
+
+    def get_sort_key(self, position_id):
+        position = self.entries[position_id][0]
+        return position.company.lower(), position.lower_title
+
+    # Compiles the keyword and location filters of a query, or reuses them if a recent query had the same ones
+    def get_filter(self, required_keywords, blacklisted_keywords, whitelisted_locations, blacklisted_locations):
+        key = (required_keywords, blacklisted_keywords, whitelisted_locations, blacklisted_locations)
+        if key not in self.filters:
+            if len(self.filters) >= QUERY_CACHE_SIZE:
+                self.filters.pop(next(iter(self.filters)))
+            self.filters[key] = PositionFilter(required_keywords=required_keywords, blacklisted_keywords=blacklisted_keywords,
+                                               whitelisted_locations=whitelisted_locations, blacklisted_locations=blacklisted_locations,
+                                               location_aliases=self.location_aliases)
+        return self.filters[key]
+
+    # Ranks every position by company and title, so a page of results can be picked out without comparing their companies and titles again
+    def rank(self):
+        self.ranks = [0] * len(self.entries)
+        for rank, position_id in enumerate(sorted(range(len(self.entries)), key=self.get_sort_key)):
+            self.ranks[position_id] = rank
+
+    # Gets a page of the positions that match every part of the query, sorted by company and title. Each part of the query is a list of values:
+    #   "q": words that all have to be in the title
+    #   "company": company names, "location": locations that the position has to be in, each matches any of its values
+    #   "required_keywords" and "blacklisted_keywords": kept like filter_by_position_title_keywords
+    #   "whitelisted_locations" and "blacklisted_locations": kept like filter_by_location
+    #   "rules": "1" to only keep positions that pass the filters from the rule files, like the ones exported to CSV
+    #   "seen": "1" or "0" to only get positions that have or haven't been seen
+    #   "current": "0" to also get positions that weren't on their job board when it was last scraped
+    #   "offset" and "limit": where the page starts and how many positions it holds
+    def query(self, query):
+        offset = int(query.get("offset", ["0"])[0])
+        limit = min(int(query.get("limit", [str(QUERY_PAGE_SIZE)])[0]), MAX_QUERY_PAGE_SIZE)
+        if offset < 0 or limit < 0:
+            raise ValueError("offset and limit can't be negative")
+
+        with self.lock:
+            key = tuple(sorted((part, tuple(values)) for part, values in query.items() if part not in ["offset", "limit"]))
+            if key not in self.results:
+                if len(self.results) >= QUERY_CACHE_SIZE:
+                    self.results.pop(next(iter(self.results)))
+                self.results[key] = self.find_matches(query)
+            matches = self.results[key]
+
+            return {
+                "Total": len(matches),
+                "Offset": offset,
+                "Limit": limit,
+                "Run": self.run,
+                "Positions": [dict(self.entries[position_id][0].to_dict(), **{
+                    "First Seen": self.entries[position_id][1], "Last Seen": self.entries[position_id][2], "Seen": position_id in self.seen
+                }) for position_id in matches[offset:offset + limit]]
+            }
+
+    # Finds the positions that match every part of a query, sorted by company and title
+    def find_matches(self, query):
+        position_filter = self.get_filter(*[tuple(query.get(rules, [])) for rules in
+                                            ["required_keywords", "blacklisted_keywords", "whitelisted_locations", "blacklisted_locations"]])
+        checks = []
+        if "required_keywords" in query or "blacklisted_keywords" in query:
+            checks.append(position_filter.keeps_title_keywords)
+        if "whitelisted_locations" in query or "blacklisted_locations" in query:
+            checks.append(position_filter.keeps_location)
+        if query.get("rules", ["0"])[0] == "1" and self.position_filter is not None:
+            checks.append(self.position_filter.keeps)
+
+        candidates = [self.titles.get(word, set()) for text in query.get("q", []) for word in TITLE_WORDS.findall(text.lower())]
+        if "company" in query:
+            candidates.append(set().union(*[self.companies.get(company.lower(), set()) for company in query["company"]]))
+        if "location" in query:
+            candidates.append(set().union(*[self.location_keys.get(self.locations.normalize(location), set()) for location in query["location"]]))
+        position_ids = set.intersection(*sorted(candidates, key=len)) if len(candidates) > 0 else range(len(self.entries))
+
+        seen = query.get("seen", [None])[0]
+        current = query.get("current", ["1"])[0] != "0"
+        matches = []
+        for position_id in position_ids:
+            position, first_seen, last_seen = self.entries[position_id]
+            if seen is not None and (position_id in self.seen) != (seen == "1"):
+                continue
+            if current and last_seen != self.latest_runs[self.get_board(position)]:
+                continue
+            if all(check(position) for check in checks):
+                matches.append(position_id)
+
+        return sorted(matches, key=self.ranks.__getitem__)
+
+
+# Serves JSON queries over the positions in the position store on localhost until interrupted, e.g. /positions?q=software+engineer&location=Seattle
+# Checks the position store for runs that finished since the last check, so it can run next to the scraper and keep up with every run
+def serve_positions(database_file=POSITIONS_DATABASE_FILE, port=QUERY_SERVER_PORT, position_filter=None, location_aliases=None):
+    index = PositionIndex(position_filter, location_aliases)
+
+    class QueryHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            link = urlparse(self.path)
+            if link.path != "/positions":
+                self.send_json(404, {"Error": "Only /positions can be queried"})
+                return
+
+            try:
+                start = time.perf_counter()
+                result = index.query(parse_qs(link.query))
+                result["Milliseconds"] = round((time.perf_counter() - start) * 1000, 3)
+            except ValueError as error:
+                self.send_json(400, {"Error": str(error)})
+                return
+            self.send_json(200, result)
+
+        def send_json(self, status, body):
+            body = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    with PositionStore(database_file) as store:
+        start = time.perf_counter()
+        index.refresh(store)
+        print("Indexed {} positions from {} in {:.2f}s".format(len(index.entries), database_file, time.perf_counter() - start))
+
+        server = ThreadingHTTPServer(("127.0.0.1", port), QueryHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print("Serving queries on http://127.0.0.1:{}/positions until stopped with Ctrl+C".format(server.server_address[1]))
+
+        try:
+            while True:
+                time.sleep(QUERY_REFRESH_INTERVAL)
+                if index.refresh(store):
+                    print("Updated the index with run " + index.run + ", {} positions indexed".format(len(index.entries)))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+# Rewrites the location lists without the locations that the rest of the lists already cover
+def compact_location_files(location_aliases=None, whitelist_file="whitelisted_locations.txt", blacklist_file="blacklisted_locations.txt"):
+    whitelisted_locations = [line.rstrip('\n') for line in open(whitelist_file)]
+    blacklisted_locations = [line.rstrip('\n') for line in open(blacklist_file)]
+    compact_whitelist, compact_blacklist = compact_location_rules(whitelisted_locations, blacklisted_locations, location_aliases)
+
+    for file_name, locations in [(whitelist_file, compact_whitelist), (blacklist_file, compact_blacklist)]:
+        with open(file_name, "w") as f:
+            f.write("".join(location + "\n" for location in locations))
+
+    print("Removed {} of {} whitelisted and {} of {} blacklisted locations".format(
+        len(whitelisted_locations) - len(compact_whitelist), len(whitelisted_locations), len(blacklisted_locations) - len(compact_blacklist), len(blacklisted_locations)))
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Scrapes job opportunities from company job boards")
+    parser.add_argument("--max-concurrent-requests", type=int, default=MAX_CONCURRENT_REQUESTS,
+                        help="maximum number of HTTP requests in flight at once (default: %(default)s)")
+    parser.add_argument("--max-requests-per-host", type=int, default=MAX_REQUESTS_PER_HOST,
+                        help="maximum number of HTTP requests in flight to a single host (default: %(default)s)")
+    parser.add_argument("--parse-processes", type=int, default=PARSE_PROCESSES,
+                        help="number of processes to parse Greenhouse and Lever HTML in, 1 parses on the main thread (default: %(default)s)")
+    parser.add_argument("--browser-pool-size", type=int, default=BROWSER_POOL_SIZE,
+                        help="number of Chrome browsers to run Selenium scrapers on in parallel (default: %(default)s)")
+    parser.add_argument("--no-ats-api", action="store_true",
+                        help="scrape Greenhouse and Lever job boards from their HTML instead of their JSON APIs")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="re-download and re-parse every job board instead of reusing unchanged responses from " + RESPONSE_CACHE_FILE)
+    parser.add_argument("--no-data-sources", action="store_true",
+                        help="scrape every custom job board in a browser instead of from the data source saved for it in " + DATA_SOURCES_FILE)
+    parser.add_argument("--stream", action="store_true",
+                        help="write positions into " + SCRAPED_POSITIONS_FILE + " as soon as each job board is scraped instead of after every board is done")
+    parser.add_argument("--no-sort", action="store_true",
+                        help="in streaming mode, leave " + SCRAPED_POSITIONS_FILE + " in the order job boards finished instead of sorting it by company")
+    parser.add_argument("--database", default=POSITIONS_DATABASE_FILE,
+                        help="SQLite database that every scraped position is saved in (default: %(default)s)")
+    parser.add_argument("--new-only", action="store_true",
+                        help="only export positions that were scraped for the first time in this run")
+    parser.add_argument("--mark-seen", action="store_true",
+                        help="mark every exported position as seen so it isn't exported again")
+    parser.add_argument("--diff", action="store_true",
+                        help="also export the positions added, removed or changed since the previous run into " +
+                             ", ".join([ADDED_POSITIONS_FILE, REMOVED_POSITIONS_FILE, CHANGED_POSITIONS_FILE]))
+    parser.add_argument("--export", nargs="+", choices=EXPORT_FORMATS, default=[],
+                        help="also export the positions into a dataset directory in " + EXPORTS_DIRECTORY + " in each of these formats")
+    parser.add_argument("--partition-by", choices=EXPORT_PARTITIONS,
+                        help="split the exports into a directory per company or per date of the run")
+    parser.add_argument("--append-exports", action="store_true",
+                        help="add each run's positions to the exports as new files instead of replacing the exports of earlier runs")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE,
+                        help="SQLite file that the job boards scraped so far are saved in, so a run that dies can be resumed (default: %(default)s)")
+    parser.add_argument("--restart", action="store_true",
+                        help="throw away the checkpoint of a run that died and scrape every job board again")
+    parser.add_argument("--schedule", action="store_true",
+                        help="keep running, scraping each job board again whenever its refresh interval is up, which adapts to how often the board changes")
+    parser.add_argument("--schedule-file", default=SCHEDULE_FILE,
+                        help="SQLite database of every job board's refresh interval and change history (default: %(default)s)")
+    parser.add_argument("--schedule-http-boards", type=int, default=SCHEDULE_HTTP_BOARDS,
+                        help="most Greenhouse, Lever and Workday job boards scraped in one round of the schedule (default: %(default)s)")
+    parser.add_argument("--schedule-browser-boards", type=int, default=SCHEDULE_BROWSER_BOARDS,
+                        help="most custom job boards scraped in one round of the schedule (default: %(default)s)")
+    parser.add_argument("--coordinator", action="store_true",
+                        help="queue every job board in the work queue for workers to scrape, then filter and export everything they scraped")
+    parser.add_argument("--worker", action="store_true",
+                        help="scrape job boards from the work queue for a coordinator instead of running the whole scraper")
+    parser.add_argument("--worker-tasks", nargs="+", choices=[HTTP_TASK, BROWSER_TASK], default=[HTTP_TASK, BROWSER_TASK],
+                        help="kinds of tasks a worker takes, http for Greenhouse, Lever and Workday job boards and browser for custom job boards (default: both)")
+    parser.add_argument("--worker-name",
+                        help="name the worker claims tasks and keeps its own response cache under, so a restarted worker reuses it (default: host and process id)")
+    parser.add_argument("--exit-when-done", action="store_true",
+                        help="stop the worker once the work queue is empty instead of waiting for more job boards")
+    parser.add_argument("--work-queue", default=WORK_QUEUE_FILE,
+                        help="SQLite database the coordinator and workers share tasks through, put it on a shared drive for workers on other machines (default: %(default)s)")
+    parser.add_argument("--serve", action="store_true",
+                        help="serve JSON queries over the positions in the position store on localhost, keeping up with every run of the scraper")
+    parser.add_argument("--port", type=int, default=QUERY_SERVER_PORT,
+                        help="port the query server listens on (default: %(default)s)")
+    parser.add_argument("--compact-location-rules", action="store_true",
+                        help="remove every location from whitelisted_locations.txt and blacklisted_locations.txt that the rest of the locations already cover, then exit")
+    parser.add_argument("--report", default=RUN_REPORT_FILE,
+                        help="JSON file to write the time, requests, bytes and positions of every scraper and filter to (default: %(default)s)")
+    parser.add_argument("--prometheus-file",
+                        help="also write the run metrics to this file in the Prometheus text format")
+    args = parser.parse_args()
+
+    for export_format in args.export:
+        module = EXPORT_FORMATS[export_format][2]
+        if module is not None and EXPORT_MODULES[module] is None:
+            parser.error("--export " + export_format + " needs " + module + " to be installed")
+
+    if args.compact_location_rules:
+        compact_location_files(load_location_aliases())
+        return
+
+    if args.serve:
+        location_aliases = load_location_aliases()
+        position_filter = PositionFilter(*[[line.rstrip('\n') for line in open(file_name)] for file_name in [
+            'blacklisted_position_titles.txt', 'required_keywords.txt', 'blacklisted_keywords.txt', 'whitelisted_locations.txt', 'blacklisted_locations.txt'
+        ]], location_aliases=location_aliases)
+        serve_positions(args.database, args.port, position_filter, location_aliases)
+        return
+
+    if args.worker:
+        run_worker(args.work_queue, args.worker_tasks, args.max_concurrent_requests, args.max_requests_per_host, args.browser_pool_size,
+                   not args.no_ats_api, not args.no_cache, args.parse_processes, args.exit_when_done, not args.no_data_sources, args.worker_name)
+        return
+
     all_companies = {
         "greenhouse": json.load(open('greenhouse_companies.json')),
         "lever": json.load(open('lever_companies.json')),
@@ -758,14 +3696,67 @@ def main():
         "workday": json.load(open('workday_companies.json'))
     }
     if len(all_companies["greenhouse"]) > 0 and len(all_companies["lever"]) > 0 and len(all_companies["selenium"]) > 0 and len(all_companies["workday"]) > 0:
-        scrape(
-            all_companies,
+        rule_lists = [
             [line.rstrip('\n') for line in open('blacklisted_position_titles.txt')],
             [line.rstrip('\n') for line in open('required_keywords.txt')],
             [line.rstrip('\n') for line in open('blacklisted_keywords.txt')],
             [line.rstrip('\n') for line in open('whitelisted_locations.txt')],
             [line.rstrip('\n') for line in open('blacklisted_locations.txt')],
             [line.rstrip('\n') for line in open('already_seen_links.txt')]
+        ]
+
+        if args.schedule:
+            scrape_on_schedule(
+                all_companies,
+                *rule_lists,
+                max_concurrent_requests=args.max_concurrent_requests,
+                max_requests_per_host=args.max_requests_per_host,
+                browser_pool_size=args.browser_pool_size,
+                use_ats_apis=not args.no_ats_api,
+                use_cache=not args.no_cache,
+                database_file=args.database,
+                new_only=args.new_only,
+                mark_seen=args.mark_seen,
+                report_file=args.report,
+                prometheus_file=args.prometheus_file,
+                parse_processes=args.parse_processes,
+                location_aliases=load_location_aliases(),
+                use_data_sources=not args.no_data_sources,
+                schedule_file=args.schedule_file,
+                http_boards=args.schedule_http_boards,
+                browser_boards=args.schedule_browser_boards,
+                export_formats=args.export,
+                partition_by=args.partition_by,
+                append_exports=args.append_exports
+            )
+            return
+
+        scrape(
+            all_companies,
+            *rule_lists,
+            max_concurrent_requests=args.max_concurrent_requests,
+            max_requests_per_host=args.max_requests_per_host,
+            browser_pool_size=args.browser_pool_size,
+            use_ats_apis=not args.no_ats_api,
+            use_cache=not args.no_cache,
+            stream=args.stream,
+            sort=not args.no_sort,
+            database_file=args.database,
+            new_only=args.new_only,
+            mark_seen=args.mark_seen,
+            report_file=args.report,
+            prometheus_file=args.prometheus_file,
+            parse_processes=args.parse_processes,
+            coordinate=args.coordinator,
+            work_queue_file=args.work_queue,
+            location_aliases=load_location_aliases(),
+            diff=args.diff,
+            use_data_sources=not args.no_data_sources,
+            checkpoint_file=args.checkpoint,
+            restart=args.restart,
+            export_formats=args.export,
+            partition_by=args.partition_by,
+            append_exports=args.append_exports
         )
 
 